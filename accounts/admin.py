@@ -1,8 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from .models import User, StaffInvitation
+from .models import OutboxEmail, User, StaffInvitation
 
 
 @admin.register(User)
@@ -47,3 +48,19 @@ class StaffInvitationAdmin(admin.ModelAdmin):
     list_filter = ("role", "restaurant", "accepted_at", "expires_at", "created_at")
     search_fields = ("email", "token", "invited_by__email", "restaurant__name")
     readonly_fields = ("token", "created_at")
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "to", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("subject", "to", "last_error")
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ["requeue"]
+
+    @admin.action(description="Requeue selected emails")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=OutboxEmail.Status.SENT).update(
+            status=OutboxEmail.Status.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"Requeued {updated} emails.")
@@ -0,0 +1,48 @@
+from django.contrib.auth import authenticate
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.throttling import TokenBucketThrottle
+
+from .serializers import RefreshRequestSerializer, TokenRequestSerializer
+from .tokens import issue_tokens, user_for_refresh_token
+
+
+class TokenThrottle(TokenBucketThrottle):
+    scope = "api_token"
+
+
+class ObtainTokenView(APIView):
+    """POST {email, password} -> {access, refresh, token_type, expires_in}."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = [TokenThrottle]
+
+    def post(self, request):
+        serializer = TokenRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)  # 400 for a list, scalar or missing field
+        user = authenticate(request._request, **serializer.validated_data)
+        if user is None:
+            return Response({"detail": "Invalid credentials."}, status=status.HTTP_401_UNAUTHORIZED)
+        if not user.is_email_verified:
+            return Response({"detail": "Email address not verified."}, status=status.HTTP_403_FORBIDDEN)
+        return Response(issue_tokens(user))
+
+
+class RefreshTokenView(APIView):
+    """POST {refresh} -> a new token pair."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = [TokenThrottle]
+
+    def post(self, request):
+        serializer = RefreshRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = user_for_refresh_token(serializer.validated_data["refresh"])
+        if user is None:
+            return Response({"detail": "Invalid or expired refresh token."}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(issue_tokens(user))
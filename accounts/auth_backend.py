@@ -1,9 +1,58 @@
-﻿from django.contrib.auth.backends import ModelBackend
+﻿from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from config.metrics import record_cache
+
 from .models import User
 
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
 class EmailBackend(ModelBackend):
-    def authenticate(self, request, email=None, password=None, **kwargs):
-        if not email: return None
-        try: user = User.objects.get(email=email)
-        except User.DoesNotExist: return None
-        return user if user.check_password(password) else None
+    """
+    The project's only authentication backend.
+    - Accepts email= (login form) or username= (admin, DRF), both meaning email.
+    - One case-insensitive query, served by the Upper(email) index.
+    - Exactly one password hash per attempt: unknown emails hash the password
+      anyway (as ModelBackend does) so response time doesn't reveal accounts.
+    - check_password() re-hashes and saves the password when the hasher or its
+      iteration count changed, so parameter upgrades happen on login.
+    """
+
+    def authenticate(self, request, email=None, password=None, username=None, **kwargs):
+        email = (email or username or "").strip()
+        if not email or password is None:
+            return None
+        matches = list(User.objects.filter(email__iexact=email)[:2])
+        if len(matches) > 1:  # legacy rows differing only in case: require the exact one
+            matches = [u for u in matches if u.email == email]
+        if len(matches) != 1:
+            User().set_password(password)
+            return None
+        user = matches[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        """
+        Per-request user lookup (AuthenticationMiddleware), served from cache.
+        - accounts/signals.py drops the entry whenever the user is saved or deleted.
+        - django.contrib.auth still compares the session's auth hash against the
+          cached user's password hash, so a password change (which saves the
+          user) keeps logging out other sessions.
+        - That only holds on every worker with a shared cache, which settings
+          require for USER_CACHE_ALIAS outside DEBUG.
+        """
+        cache = caches[settings.USER_CACHE_ALIAS]
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        record_cache("user", user is not None)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
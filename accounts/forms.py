@@ -1,4 +1,11 @@
-﻿from django import forms
+﻿import csv
+import io
+import re
+
+from django import forms
+from django.conf import settings
+from django.core.validators import validate_email
+
 from .models import User
 
 pwd_help = "Min 8 chars, at least 1 letter and 1 digit."
@@ -65,3 +72,54 @@ class LoginForm(forms.Form):
     password = forms.CharField(
         widget=forms.PasswordInput(attrs={"class": "form-control form-control-sm"})
     )
+
+
+class BulkInviteForm(forms.Form):
+    """
+    Staff addresses pasted into a textarea and/or uploaded as CSV (an "email"
+    column, or the first column when there is no header).
+    cleaned_data["emails"] is the lower-cased, de-duplicated list.
+    """
+
+    emails = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={"rows": 8, "placeholder": "one@example.com, two@example.com"}),
+        help_text="Separate addresses with commas, semicolons or new lines.",
+    )
+    csv_file = forms.FileField(required=False, label="CSV file")
+
+    @staticmethod
+    def _csv_addresses(upload):
+        text = upload.read().decode("utf-8-sig", errors="replace")
+        rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+        if not rows:
+            return []
+        header = [cell.strip().lower() for cell in rows[0]]
+        column = header.index("email") if "email" in header else 0
+        if "email" in header or "@" not in rows[0][column]:
+            rows = rows[1:]
+        return [row[column] for row in rows if len(row) > column]
+
+    def clean(self):
+        cleaned = super().clean()
+        raw = re.split(r"[\s,;]+", cleaned.get("emails") or "")
+        if cleaned.get("csv_file"):
+            raw += self._csv_addresses(cleaned["csv_file"])
+
+        emails, invalid = [], []
+        for address in dict.fromkeys(a.strip().lower() for a in raw if a.strip()):
+            try:
+                validate_email(address)
+            except forms.ValidationError:
+                invalid.append(address)
+            else:
+                emails.append(address)
+        if invalid:
+            shown = ", ".join(invalid[:10]) + (" ..." if len(invalid) > 10 else "")
+            raise forms.ValidationError(f"{len(invalid)} invalid address(es): {shown}")
+        if not emails:
+            raise forms.ValidationError("Add at least one email address.")
+        if len(emails) > settings.INVITE_BULK_MAX:
+            raise forms.ValidationError(f"At most {settings.INVITE_BULK_MAX} addresses per import.")
+        cleaned["emails"] = emails
+        return cleaned
@@ -0,0 +1,70 @@
+import zlib
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+
+# pg_advisory_xact_lock key shared by every service's pods
+LOCK_KEY = zlib.crc32(b"bookify:migrate")
+
+
+def unapplied_migrations(connection):
+    """
+    Migrations on disk that aren't recorded in django_migrations, read with a
+    single query (the graph itself is built from the migration files).
+    """
+    graph = MigrationLoader(None, ignore_no_migrations=True).graph
+    try:
+        applied = set(MigrationRecorder(connection).migration_qs.values_list("app", "name"))
+    except DatabaseError:
+        return sorted(graph.nodes)  # no django_migrations table: a fresh database
+    return sorted(set(graph.nodes) - applied)
+
+
+class Command(BaseCommand):
+    help = (
+        "Startup migration step: exit at once if every migration is applied, "
+        "otherwise apply them under a Postgres advisory lock so that one pod "
+        "migrates while the others wait for it."
+    )
+    requires_system_checks = []  # migrate runs them itself when there is work
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lock-timeout", type=int, default=600,
+            help="Seconds to wait for another pod's migration before failing.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if not unapplied_migrations(connection):
+            self.stdout.write("No migrations to apply.")
+            return
+        if connection.vendor != "postgresql":
+            self._migrate(options)
+            return
+
+        # The lock lives in a transaction on its own connection, which stays
+        # open (and, behind PgBouncer, pinned to one server) while migrate runs
+        # its per-migration transactions on the default connection
+        lock = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            lock.set_autocommit(False)
+            with lock.cursor() as cursor:
+                cursor.execute("SELECT set_config('lock_timeout', %s, true)", [f"{options['lock_timeout']}s"])
+                try:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", [LOCK_KEY])
+                except DatabaseError as exc:
+                    raise CommandError(f"Timed out waiting for the migration lock: {exc}")
+            if unapplied_migrations(connection):
+                self._migrate(options)
+            else:
+                self.stdout.write("Migrations were applied by another instance.")
+        finally:
+            lock.rollback()  # releases the lock
+            lock.close()
+
+    def _migrate(self, options):
+        call_command("migrate", interactive=False, verbosity=options["verbosity"])
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from accounts.sessions import purge_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions in bounded batches so the purge never holds "
+        "long locks on django_session. Meant to run from a CronJob."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause", type=float, default=0.05,
+            help="Seconds to sleep between batches.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for deleted in purge_expired(options["batch_size"], options["pause"]):
+            total += deleted
+            if options["verbosity"] > 1:
+                self.stdout.write(f"deleted {deleted} (total {total})")
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired sessions."))
@@ -0,0 +1,51 @@
+import logging
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.outbox import deliver_due
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued transactional email (accounts.OutboxEmail) in batches "
+        "over one SMTP connection. Use --loop to run as a long-lived worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument("--loop", action="store_true", help="Keep polling until SIGTERM/SIGINT.")
+        parser.add_argument(
+            "--interval", type=float, default=2.0,
+            help="Seconds to sleep when the outbox is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["loop"]:
+            sent, failed = deliver_due(options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails ({failed} failed)."))
+            return
+
+        self.running = True
+
+        def stop(signum, frame):
+            self.running = False
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        while self.running:
+            close_old_connections()
+            try:
+                sent, failed = deliver_due(options["batch_size"])
+            except Exception:
+                logger.exception("Outbox delivery failed; retrying after %ss", options["interval"])
+                sent = failed = 0
+            if sent or failed:
+                self.stdout.write(f"sent {sent}, failed {failed}")
+            else:
+                time.sleep(options["interval"])
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0006_user_email_upper_idx"),
+        ("restaurants", "0013_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="staffinvitation",
+            index=models.Index(
+                fields=["invited_by", "email", "expires_at"],
+                name="invite_sender_email_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="staffinvitation",
+            index=models.Index(
+                fields=["invited_by", "-created_at"], name="invite_sender_created_idx"
+            ),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.signing import TimestampSigner, BadSignature, SignatureExpired
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 
@@ -58,6 +59,10 @@ class User(AbstractUser):
     REQUIRED_FIELDS = []
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        # Case-insensitive login lookups (email__iexact) use this index
+        indexes = [models.Index(Upper("email"), name="user_email_upper_idx")]
+
     def make_email_token(self) -> str:
         return TimestampSigner().sign(f"verify:{self.pk}")
 
@@ -95,6 +100,14 @@ class StaffInvitation(models.Model):
     accepted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # duplicate checks in create/bulk invite views
+            models.Index(fields=["invited_by", "email", "expires_at"], name="invite_sender_email_idx"),
+            # owner dashboard list
+            models.Index(fields=["invited_by", "-created_at"], name="invite_sender_created_idx"),
+        ]
+
     @staticmethod
     def create_token():
         return get_random_string(48)
@@ -109,5 +122,50 @@ class StaffInvitation(models.Model):
             expires_at=timezone.now() + timedelta(days=days_valid),
         )
 
+    @classmethod
+    def bulk_invite(cls, *, emails, invited_by, restaurant=None, days_valid=3):
+        """Create one invitation per address with a single INSERT."""
+        expires_at = timezone.now() + timedelta(days=days_valid)
+        return cls.objects.bulk_create(
+            cls(
+                email=email,
+                restaurant=restaurant,
+                token=cls.create_token(),
+                invited_by=invited_by,
+                expires_at=expires_at,
+            )
+            for email in emails
+        )
+
     def is_valid(self):
         return self.accepted_at is None and timezone.now() < self.expires_at
+
+
+class OutboxEmail(models.Model):
+    """
+    Transactional email waiting to be sent. Rows are written in the same DB
+    transaction as the user/invitation they belong to and delivered by
+    `manage.py send_outbox` (see accounts/outbox.py).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENT = "SENT", "Sent"
+        DEAD = "DEAD", "Dead (gave up)"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=8, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx")]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
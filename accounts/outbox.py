@@ -0,0 +1,165 @@
+"""
+Transactional email outbox.
+
+- enqueue_mail() only inserts an OutboxEmail row, so it commits or rolls back
+  together with whatever the request wrote; no SMTP inside the request.
+- deliver_due() sends due rows in batches over one reused connection.
+  Failures back off exponentially (doubling from OUTBOX_RETRY_BASE seconds,
+  capped at OUTBOX_RETRY_MAX) and after OUTBOX_MAX_ATTEMPTS the row is dead-lettered
+  (status DEAD, kept for inspection / requeue from the admin).
+- Rows are claimed in a short transaction (SELECT ... FOR UPDATE SKIP LOCKED)
+  that leases them by pushing next_attempt_at OUTBOX_LEASE_SECONDS ahead, so
+  several workers can drain the same table and no row lock or transaction is
+  held while SMTP runs. A worker that dies mid-batch leaves its rows to be
+  picked up again when the lease runs out.
+- A relay that can't be reached counts as a failed attempt for every claimed
+  row, so an outage backs them off (and eventually dead-letters them) like
+  any other failure.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_mail(subject, message, recipient_list, from_email=None):
+    """Drop-in for send_mail(): queue the message instead of sending it."""
+    email = OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or "",
+        to=list(recipient_list),
+    )
+    if settings.OUTBOX_DELIVER_IN_PROCESS:
+        # Dev convenience: no separate worker needed with the console backend
+        transaction.on_commit(_deliver_in_background)
+    return email
+
+
+def enqueue_many(messages):
+    """Queue many (subject, message, recipient_list) tuples with one INSERT."""
+    emails = OutboxEmail.objects.bulk_create(
+        OutboxEmail(subject=subject, body=body, to=list(to)) for subject, body, to in messages
+    )
+    if emails and settings.OUTBOX_DELIVER_IN_PROCESS:
+        transaction.on_commit(_deliver_in_background)
+    return emails
+
+
+def _deliver_in_background():
+    def run():
+        try:
+            deliver_due()
+        except Exception:
+            logger.exception("In-process outbox delivery failed; rows stay queued")
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=run, name="outbox", daemon=True).start()
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_BASE * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX))
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            )
+    return batch
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = error
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboxEmail.Status.DEAD
+        logger.error("Outbox email %s dead-lettered: %s", email.pk, error)
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+
+
+def deliver_batch(batch_size=None, connection=None):
+    """
+    Send up to `batch_size` due emails. Returns (sent, failed).
+    The connection is opened once for the batch and left open for the caller.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    connection = connection or get_connection()
+    batch = _claim(batch_size)
+    if not batch:
+        return 0, 0
+    sent = failed = 0
+    try:
+        try:
+            connection.open()
+        except Exception as exc:
+            logger.warning("Mail relay unavailable: %s", exc)
+            for email in batch:
+                _record_failure(email, f"{type(exc).__name__}: {exc}")
+            return 0, len(batch)
+        for i, email in enumerate(batch):
+            try:
+                EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email or None,
+                    to=email.to,
+                    connection=connection,
+                ).send()
+            except Exception as exc:
+                failed += 1
+                _record_failure(email, f"{type(exc).__name__}: {exc}")
+                # The failure may have broken the connection; start a fresh one
+                try:
+                    connection.close()
+                    connection.open()
+                except Exception as exc:
+                    logger.warning("Mail relay unavailable, failing the rest of the batch: %s", exc)
+                    for rest in batch[i + 1:]:
+                        _record_failure(rest, f"{type(exc).__name__}: {exc}")
+                    failed += len(batch) - i - 1
+                    break
+            else:
+                sent += 1
+                email.attempts += 1
+                email.status = OutboxEmail.Status.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ""
+    finally:
+        # Rows not reached (an unexpected error) get their pre-lease next_attempt_at back
+        OutboxEmail.objects.bulk_update(
+            batch, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"]
+        )
+    return sent, failed
+
+
+def deliver_due(batch_size=None):
+    """Drain everything currently due. Returns (sent, failed)."""
+    connection = get_connection()
+    total_sent = total_failed = 0
+    try:
+        while True:
+            sent, failed = deliver_batch(batch_size, connection)
+            total_sent += sent
+            total_failed += failed
+            if not sent and not failed:
+                return total_sent, total_failed
+    finally:
+        connection.close()
@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+
+class TokenRequestSerializer(serializers.Serializer):
+    email = serializers.CharField()
+    password = serializers.CharField(trim_whitespace=False)
+
+
+class RefreshRequestSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
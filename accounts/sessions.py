@@ -0,0 +1,172 @@
+"""
+Cache-first session engine with lazy write-behind to the database.
+
+Builds on Django's cached_db engine, but only touches storage when it has to:
+- Reads come from the cache; the DB is only read on a cache miss.
+- A save whose data is identical to what was loaded is skipped entirely.
+- New sessions and any change to the auth keys (login, logout, password
+  change) are written to the DB at once, so authentication state always
+  survives a cache flush.
+- Other changes go to the cache immediately and reach the DB at most once
+  per SESSION_DB_WRITE_INTERVAL seconds per session. A change that isn't
+  due yet is queued and written by a background flush (every interval, and
+  when the worker exits), so it isn't lost when no later save comes.
+- Outside DEBUG settings require SESSION_CACHE_ALIAS to be shared by every
+  worker, so a logout or flush() is seen everywhere at once.
+- clear_expired() (and so `manage.py clearsessions`) deletes in bounded
+  batches; see also `manage.py purge_sessions`.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+AUTH_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY)
+
+
+def _auth_state(data):
+    return tuple(data.get(key) for key in AUTH_KEYS)
+
+
+class SessionStore(CachedDBStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_blob = None
+        self._loaded_auth = None
+
+    def _snapshot(self, data):
+        return self.serializer().dumps(data)
+
+    @property
+    def _sync_key(self):
+        return f"{self.cache_key}:synced"
+
+    def load(self):
+        data = super().load()
+        self._loaded_blob = self._snapshot(data)
+        self._loaded_auth = _auth_state(data)
+        return data
+
+    def _db_write_due(self):
+        # add() only succeeds once the previous marker has expired
+        try:
+            return self._cache.add(self._sync_key, 1, settings.SESSION_DB_WRITE_INTERVAL)
+        except Exception:
+            return True
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        blob = self._snapshot(data)
+        if not must_create and blob == self._loaded_blob:
+            return
+
+        auth = _auth_state(data)
+        if must_create or auth != self._loaded_auth:
+            DBStore.save(self, must_create=must_create)
+            self._cache.set(self._sync_key, 1, settings.SESSION_DB_WRITE_INTERVAL)
+            _deferred.discard(self.session_key)
+        elif self._db_write_due():
+            DBStore.save(self)
+            _deferred.discard(self.session_key)
+        else:
+            _deferred.add(self.session_key, data)
+        self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+        self._loaded_blob = blob
+        self._loaded_auth = auth
+
+    def delete(self, session_key=None):
+        _deferred.discard(session_key or self.session_key)
+        super().delete(session_key)
+
+    @classmethod
+    def clear_expired(cls):
+        for _ in purge_expired():
+            pass
+
+
+class _DeferredWrites:
+    """
+    Sessions of this process whose latest change is only in the cache. A
+    daemon thread writes them to the DB every SESSION_DB_WRITE_INTERVAL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # session_key -> data as of our last save
+        self._thread = None
+
+    def add(self, session_key, data):
+        with self._lock:
+            self._pending[session_key] = dict(data)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="session-flush", daemon=True)
+                self._thread.start()
+
+    def discard(self, session_key):
+        with self._lock:
+            self._pending.pop(session_key, None)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.SESSION_DB_WRITE_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Deferred session flush failed")
+            finally:
+                connections.close_all()  # this thread's connections only
+
+    def flush(self):
+        """Write every queued session to the DB. Returns how many were written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        written = 0
+        for session_key, data in pending.items():
+            store = SessionStore(session_key)
+            # The cache holds the newest data (possibly saved by another
+            # worker); our own copy covers an evicted entry
+            cached = store._cache.get(store.cache_key)
+            store._session_cache = cached if cached is not None else data
+            try:
+                DBStore.save(store)
+            except UpdateError:
+                continue  # deleted meanwhile (logout, expiry): don't bring it back
+            written += 1
+        return written
+
+
+_deferred = _DeferredWrites()
+flush_deferred_writes = _deferred.flush
+atexit.register(flush_deferred_writes)
+
+
+def purge_expired(batch_size=1000, pause=0.0):
+    """
+    Delete expired sessions `batch_size` rows at a time instead of one giant
+    DELETE. Yields the number of rows removed per batch.
+    """
+    model = SessionStore.get_model_class()
+    now = timezone.now()
+    while True:
+        keys = list(
+            model.objects.filter(expire_date__lt=now)
+            .values_list("session_key", flat=True)[:batch_size]
+        )
+        if not keys:
+            return
+        deleted, _ = model.objects.filter(session_key__in=keys).delete()
+        yield deleted
+        if pause:
+            time.sleep(pause)
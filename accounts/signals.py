@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth_backend import user_cache_key
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    # After commit, so a concurrent request can't re-cache the old row
+    key = user_cache_key(instance.pk)
+    transaction.on_commit(lambda: caches[settings.USER_CACHE_ALIAS].delete(key))
@@ -1,3 +1,623 @@
-from django.test import TestCase
+import datetime
+import os
+import subprocess
+import sys
+import threading
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from config.db_routing import ReplicaRouter, ReplicaRoutingMiddleware, replica_reads
+from config.query_budget import QueryBudgetTestMixin, QueryStats, track_queries
+from config.throttling import _gcra, consume, parse_rate, request_ident
+from config.warmup import warm_up
+from restaurants.models import Reservation, Restaurant
+from restaurants.views import PublicRestaurantDetailView, PublicRestaurantListView, RestaurantViewSet
+
+from .auth_backend import EmailBackend, user_cache_key
+from .management.commands.migrate_if_needed import LOCK_KEY, unapplied_migrations
+from .models import OutboxEmail, StaffInvitation, User
+from .outbox import _claim, deliver_batch, enqueue_mail, retry_delay
+from .sessions import SessionStore, flush_deferred_writes
+from .tokens import read_access_token
+
+ROWS = 12  # enough rows that a per-row query shows up as a repeated shape
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """The hot pages stay within their settings.QUERY_BUDGETS entry whatever the row count."""
+
+    def setUp(self):
+        cache.clear()  # cached users/pages from other tests share primary keys with ours
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            email="owner@example.com", password="pw", role=User.Roles.OWNER
+        )
+        cls.customer = User.objects.create_user(email="customer@example.com", password="pw")
+        restaurants = [
+            Restaurant.objects.create(
+                owner=cls.owner if i == 0 else User.objects.create_user(f"owner{i}@example.com", role=User.Roles.OWNER),
+                name=f"Restaurant {i}",
+                address=f"{i} Main Street",
+                cuisine="Lebanese",
+                capacity=40,
+                opening_hours={"Mon": {"open": "12:00", "close": "23:00"}},
+            )
+            for i in range(ROWS)
+        ]
+        today = timezone.localdate()
+        for n in range(ROWS):
+            Reservation.objects.create(
+                restaurant=restaurants[n % 2],
+                customer=User.objects.create_user(f"guest{n}@example.com")
+                if n % 2 == 0 else cls.customer,
+                reservation_date=today + datetime.timedelta(days=n - 2),
+                reservation_time=datetime.time(20, 0),
+                party_size=2,
+                status=Reservation.Status.PENDING if n % 3 else Reservation.Status.CONFIRMED,
+            )
+            StaffInvitation.objects.create(
+                email=f"staff{n}@example.com",
+                restaurant=restaurants[0],
+                token=StaffInvitation.create_token(),
+                invited_by=cls.owner,
+                expires_at=timezone.now() + datetime.timedelta(days=n - 2),
+            )
+
+    def test_customer_dashboard(self):
+        self.client.force_login(self.customer)
+        self.assertWithinQueryBudget(reverse("customer_dashboard"))
+
+    def test_owner_dashboard(self):
+        self.client.force_login(self.owner)
+        self.assertWithinQueryBudget(reverse("owner_dashboard"))
+
+    def test_public_pages(self):
+        self.assertWithinQueryBudget(reverse("restaurant_browse"))
+        restaurant = Restaurant.objects.first()
+        self.assertWithinQueryBudget(reverse("restaurant_detail", args=[restaurant.pk]))
+        self.assertWithinQueryBudget(reverse("restaurant-list"))
+
+
+class WarmUpTests(SimpleTestCase):
+    """config/warmup.py: what gunicorn runs before forking workers, without the database."""
+
+    def test_warm_up(self):
+        patterns, templates, _ = warm_up()
+        self.assertGreater(patterns, 0)
+        self.assertGreater(templates, 0)
+        reverse("restaurant_browse")
+
+
+class MigrateIfNeededTests(TestCase):
+    def test_nothing_to_apply(self):
+        self.assertEqual(unapplied_migrations(connection), [])
+        out = StringIO()
+        with self.assertNumQueries(1):
+            call_command("migrate_if_needed", stdout=out)
+        self.assertEqual(out.getvalue(), "No migrations to apply.\n")
+
+    def pending(self, *results):
+        # Pretend a deploy shipped a migration this database hasn't seen
+        return mock.patch(
+            "accounts.management.commands.migrate_if_needed.unapplied_migrations",
+            side_effect=results,
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "the advisory lock is Postgres-only")
+    def test_waits_for_lock_holder(self):
+        holder = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            holder.set_autocommit(False)
+            with holder.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [LOCK_KEY])
+            with self.pending([("restaurants", "9999_new")]), self.assertRaisesMessage(
+                CommandError, "Timed out waiting for the migration lock"
+            ):
+                call_command("migrate_if_needed", lock_timeout=1, stdout=StringIO())
+        finally:
+            holder.rollback()
+            holder.close()
+
+    @skipUnless(connection.vendor == "postgresql", "the advisory lock is Postgres-only")
+    def test_rechecks_under_lock_and_releases_it(self):
+        out = StringIO()
+        with self.pending([("restaurants", "9999_new")], []) as unapplied:
+            call_command("migrate_if_needed", lock_timeout=1, stdout=out)
+        self.assertEqual(unapplied.call_count, 2)
+        self.assertEqual(out.getvalue(), "Migrations were applied by another instance.\n")
+
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            with other.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [LOCK_KEY])
+                self.assertTrue(cursor.fetchone()[0])
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [LOCK_KEY])
+        finally:
+            other.close()
+
+
+class ThrottleTests(SimpleTestCase):
+    """config/throttling.py: GCRA buckets and who a bucket belongs to."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_gcra(self):
+        capacity, interval = parse_rate("3/min")
+        self.assertEqual((capacity, interval), (3, 20000))
+        tat, now = None, 1_000_000
+        for _ in range(capacity):  # a full bucket allows a burst of `capacity`
+            tat, wait = _gcra(tat, now, interval, interval * capacity)
+            self.assertEqual(wait, 0)
+        self.assertEqual(_gcra(tat, now, interval, interval * capacity), (None, interval))
+        # one interval later exactly one more token is free
+        tat, wait = _gcra(tat, now + interval, interval, interval * capacity)
+        self.assertEqual(wait, 0)
+        self.assertIsNone(_gcra(tat, now + interval, interval, interval * capacity)[0])
+
+    @override_settings(THROTTLE_RATES={"test": "3/min"})
+    def test_consume(self):
+        self.assertEqual([consume("test", "ip:1") for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(consume("test", "ip:1"), 20, delta=1)
+        self.assertEqual(consume("test", "ip:2"), 0)  # buckets are per ident
+        self.assertEqual(consume("unknown-scope", "ip:1"), 0)
+
+    @skipUnless(os.environ.get("TEST_REDIS_URL"), "set TEST_REDIS_URL to run the Lua script against Redis")
+    def test_consume_on_redis(self):
+        redis = {"default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("TEST_REDIS_URL"),
+        }}
+        with override_settings(CACHES=redis, THROTTLE_RATES={"test": "3/min"}):
+            caches["default"].delete("throttle:test:ip:redis")
+            self.assertEqual([consume("test", "ip:redis") for _ in range(3)], [0, 0, 0])
+            self.assertAlmostEqual(consume("test", "ip:redis"), 20, delta=1)
+
+    def test_ident_ignores_client_forwarded_for(self):
+        factory = RequestFactory()
+        spoofed = [
+            factory.get("/", REMOTE_ADDR="10.0.0.9", HTTP_X_FORWARDED_FOR=f"203.0.113.{n}")
+            for n in range(3)
+        ]
+        # Default NUM_PROXIES=0: rotating the header doesn't give a new bucket
+        self.assertEqual({request_ident(request) for request in spoofed}, {"ip:10.0.0.9"})
+        with override_settings(REST_FRAMEWORK={"NUM_PROXIES": 1}):
+            request = factory.get("/", REMOTE_ADDR="10.0.0.9", HTTP_X_FORWARDED_FOR="1.2.3.4, 198.51.100.7")
+            self.assertEqual(request_ident(request), "ip:198.51.100.7")  # what the ingress appended
+
+
+class SharedCacheSettingsTests(SimpleTestCase):
+    """Outside DEBUG, settings refuse a per-process cache for shared state."""
+
+    def import_settings(self, **env):
+        environ = {k: v for k, v in os.environ.items() if k != "CACHE_URL"}
+        return subprocess.run(
+            [sys.executable, "-c", "import config.settings"],
+            cwd=settings.BASE_DIR, env={**environ, "DEBUG": "False", **env},
+            capture_output=True, text=True,
+        )
+
+    def test_locmem_refused(self):
+        result = self.import_settings()
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("ImproperlyConfigured", result.stderr)
+
+    def test_redis_accepted(self):
+        result = self.import_settings(CACHE_URL="redis://redis-service:6379/0")
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class UserCacheTests(TestCase):
+    """Cached users (EmailBackend.get_user) never outlive a password change or deactivation."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("customer@example.com", "old-password")
+        self.client.login(username="customer@example.com", password="old-password")
+        self.dashboard = reverse("customer_dashboard")
+        self.assertEqual(self.client.get(self.dashboard).status_code, 200)
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_password_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("new-password")
+            self.user.save()
+        self.assertEqual(self.client.get(self.dashboard).status_code, 302)  # old session is out
+        fresh = self.client_class()
+        self.assertTrue(fresh.login(username="customer@example.com", password="new-password"))
+        self.assertEqual(fresh.get(self.dashboard).status_code, 200)  # the new one isn't
+
+    def test_deactivation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(self.dashboard).status_code, 302)
+
+
+class SessionTests(TestCase):
+    """accounts/sessions.py: cache-first sessions with deferred DB writes."""
+
+    def setUp(self):
+        cache.clear()
+        flush_deferred_writes()
+
+    def stored(self, session_key):
+        session = SessionStore.get_model_class().objects.filter(session_key=session_key).first()
+        return session.get_decoded() if session else None
+
+    def deferred_change(self):
+        store = SessionStore()
+        store["cart"] = 1
+        store.save()  # new session: written at once
+        store = SessionStore(store.session_key)
+        store["cart"] = 2
+        store.save()  # written recently: deferred
+        self.assertEqual(self.stored(store.session_key)["cart"], 1)
+        return store
+
+    def test_logout_invalidates_session(self):
+        User.objects.create_user("customer@example.com", "pw")
+        self.client.login(username="customer@example.com", password="pw")
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.client.post(reverse("logout"))
+
+        replay = Client()
+        replay.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        self.assertEqual(replay.get(reverse("customer_dashboard")).status_code, 302)
+        self.assertIsNone(self.stored(session_key))
+        self.assertIsNone(cache.get(SessionStore(session_key).cache_key))
+
+    def test_deferred_write_is_flushed(self):
+        store = self.deferred_change()
+        self.assertEqual(flush_deferred_writes(), 1)
+        self.assertEqual(self.stored(store.session_key)["cart"], 2)
+
+    def test_deferred_write_survives_cache_eviction(self):
+        store = self.deferred_change()
+        cache.delete(store.cache_key)
+        flush_deferred_writes()
+        self.assertEqual(self.stored(store.session_key)["cart"], 2)
+
+    def test_deleted_session_is_not_resurrected(self):
+        store = self.deferred_change()
+        # Logged out on another worker: that process's queue isn't ours
+        SessionStore.get_model_class().objects.filter(session_key=store.session_key).delete()
+        cache.delete(store.cache_key)
+        self.assertEqual(flush_deferred_writes(), 0)
+        self.assertIsNone(self.stored(store.session_key))
+
+
+class BulkInviteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_skips_active_invites_whatever_their_case(self):
+        owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+        restaurant = Restaurant.objects.create(
+            owner=owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=40
+        )
+        StaffInvitation.new_invite(email="Chef@Example.com", invited_by=owner, restaurant=restaurant)
+
+        self.client.force_login(owner)
+        self.client.post(reverse("bulk_invitations"), {"emails": "chef@example.com, sous@example.com"})
+        self.assertEqual(
+            sorted(StaffInvitation.objects.values_list("email", flat=True)),
+            ["Chef@Example.com", "sous@example.com"],
+        )
+
+
+class ApiTokenTests(TestCase):
+    """accounts/api_views.py + accounts/tokens.py."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("diner@example.com", "pw", is_email_verified=True)
+
+    def obtain(self, body):
+        return self.client.post(reverse("api_token"), body, content_type="application/json")
+
+    def refresh(self, token):
+        return self.client.post(reverse("api_token_refresh"), {"refresh": token}, content_type="application/json")
+
+    def test_malformed_bodies(self):
+        for body in ([], ["diner@example.com", "pw"], "pw", 3, {"email": "diner@example.com"}):
+            self.assertEqual(self.obtain(body).status_code, 400, body)
+        self.assertEqual(
+            self.client.post(reverse("api_token_refresh"), [], content_type="application/json").status_code, 400
+        )
+        self.assertEqual(self.obtain({"email": "diner@example.com", "password": "wrong"}).status_code, 401)
+
+    def test_expiry(self):
+        tokens = self.obtain({"email": "diner@example.com", "password": "pw"}).json()
+        self.assertEqual(read_access_token(tokens["access"])["uid"], self.user.pk)
+        with override_settings(API_ACCESS_TOKEN_TTL=-1, API_REFRESH_TOKEN_TTL=-1):
+            self.assertIsNone(read_access_token(tokens["access"]))
+            self.assertEqual(self.refresh(tokens["refresh"]).status_code, 401)
+
+    def test_tampered_tokens(self):
+        tokens = self.obtain({"email": "diner@example.com", "password": "pw"}).json()
+        for token in (tokens["access"], tokens["refresh"]):
+            tampered = token[:-1] + ("A" if token[-1] != "A" else "B")
+            self.assertIsNone(read_access_token(tampered))
+            self.assertEqual(self.refresh(tampered).status_code, 401)
+        # An access token isn't a refresh token: the salts differ
+        self.assertEqual(self.refresh(tokens["access"]).status_code, 401)
+        response = self.client.get(reverse("restaurant-list"), HTTP_AUTHORIZATION=f"Bearer {tokens['access']}x")
+        self.assertEqual(response.status_code, 401)
+
+    def test_password_change_revokes_refresh_tokens(self):
+        tokens = self.obtain({"email": "diner@example.com", "password": "pw"}).json()
+        self.assertEqual(self.refresh(tokens["refresh"]).status_code, 200)
+        self.user.set_password("new password")
+        self.user.save()
+        self.assertEqual(self.refresh(tokens["refresh"]).status_code, 401)
+
+
+class EmailBackendTests(TestCase):
+    """accounts/auth_backend.py: the login lookup."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("Diner@example.com", "pw")
+
+    def authenticate(self, email, password="pw"):
+        return EmailBackend().authenticate(None, email=email, password=password)
+
+    def hashes(self):
+        """Counts password hashes computed by the default hasher."""
+        hasher = type(get_hasher())
+        return mock.patch.object(hasher, "encode", autospec=True, side_effect=hasher.encode)
+
+    def test_email_is_case_insensitive(self):
+        for email in ("Diner@example.com", "diner@EXAMPLE.com", "  DINER@example.com "):
+            self.assertEqual(self.authenticate(email), self.user, email)
+        self.assertEqual(EmailBackend().authenticate(None, username="diner@example.com", password="pw"), self.user)
+        self.assertIsNone(self.authenticate("diner@example.com", "wrong"))
+
+    def test_one_hash_per_attempt(self):
+        for email, password in (("nobody@example.com", "pw"), ("diner@example.com", "wrong")):
+            with self.hashes() as encode:
+                self.assertIsNone(self.authenticate(email, password))
+            self.assertEqual(encode.call_count, 1, email)
+
+    def test_inactive_user(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.authenticate("diner@example.com"))
+
+    def test_case_variant_duplicates_need_the_exact_email(self):
+        twin = User.objects.create_user("diner@example.com", "twin pw")
+        self.assertEqual(self.authenticate("diner@example.com", "twin pw"), twin)
+        self.assertEqual(self.authenticate("Diner@example.com"), self.user)
+        with self.hashes() as encode:
+            self.assertIsNone(self.authenticate("DINER@example.com"))
+        self.assertEqual(encode.call_count, 1)
+
+
+class MetricsTests(TestCase):
+    """config/metrics.py: query instrumentation and who may scrape."""
+
+    def queries_observed(self):
+        return REGISTRY.get_sample_value("bookify_db_query_duration_seconds_count", {"alias": DEFAULT_DB_ALIAS}) or 0
+
+    def test_reconnecting_keeps_one_query_wrapper(self):
+        db = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            for _ in range(3):  # a reconnect sends connection_created again
+                db.connect()
+                db.close()  # a no-op for SQLite's in-memory test database
+            self.assertEqual(len(db.execute_wrappers), 1)
+            before = self.queries_observed()
+            with db.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            self.assertEqual(self.queries_observed() - before, 1)
+        finally:
+            db.close()
+
+    def test_connection_opened_inside_track_queries(self):
+        def run():
+            # A new thread has its own, not yet connected, connections
+            db = connections[DEFAULT_DB_ALIAS]
+            try:
+                with track_queries() as stats:
+                    with db.cursor() as cursor:
+                        cursor.execute("SELECT 1")  # connects: connection_created fires here
+                result["wrappers"] = list(db.execute_wrappers)
+                before = self.queries_observed()
+                with db.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                result["observed"] = self.queries_observed() - before
+                result["tracked"] = stats.count
+            finally:
+                db.close()
+
+        result = {}
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(result["wrappers"]), 1)
+        self.assertNotIsInstance(result["wrappers"][0], QueryStats)
+        self.assertEqual((result["observed"], result["tracked"]), (1, 1))
+
+    def test_scrapes_need_the_token(self):
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+        with override_settings(METRICS_TOKEN="s3cret"):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+            self.assertEqual(
+                self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code, 403
+            )
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+            self.assertContains(response, "bookify_db_query_duration_seconds")
+
+
+@mock.patch("config.db_routing.replicas", return_value=["replica1"])
+class ReplicaRoutingTests(SimpleTestCase):
+    """config/db_routing.py: which views read from a replica, and the pin cookie."""
+
+    def request(self, view, method="get", cookies=None, write=None):
+        """Run `view` through the middleware; returns (read alias, response)."""
+        seen = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen.append(ReplicaRouter().db_for_read(Restaurant))
+            if write is not None:
+                ReplicaRouter().db_for_write(write)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+        response = middleware(request)
+        self.assertEqual(ReplicaRouter().db_for_read(Restaurant), "default")  # reset afterwards
+        return seen[0], response
+
+    def test_opted_in_reads(self, replicas):
+        api_list = RestaurantViewSet.as_view({"get": "list", "post": "create"})
+        self.assertEqual(self.request(api_list)[0], "replica1")
+        self.assertEqual(self.request(api_list, "post")[0], "default")
+        self.assertEqual(self.request(replica_reads(lambda request: None))[0], "replica1")
+        self.assertEqual(self.request(lambda request: None)[0], "default")
+
+    def test_cached_pages_read_from_primary(self, replicas):
+        for view in (PublicRestaurantListView.as_view(), PublicRestaurantDetailView.as_view()):
+            self.assertEqual(self.request(view)[0], "default")
+
+    def test_write_pins_the_browser_to_the_primary(self, replicas):
+        api_list = RestaurantViewSet.as_view({"get": "list", "post": "create"})
+        _, response = self.request(api_list, "post", write=Restaurant)
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.REPLICA_PIN_SECONDS)
+
+        pinned = {settings.REPLICA_PIN_COOKIE: cookie.value}
+        self.assertEqual(self.request(api_list, cookies=pinned)[0], "default")
+        # Session saves happen on plain reads and don't pin
+        _, response = self.request(api_list, write=Session)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_reads_after_a_write_in_the_same_request(self, replicas):
+        self.assertEqual(ReplicaRouter().db_for_write(Restaurant), "default")  # outside a request: no-op
+        api_list = RestaurantViewSet.as_view({"get": "list"})
+        seen = []
+
+        def get_response(request):
+            middleware.process_view(request, api_list, (), {})
+            seen.append(ReplicaRouter().db_for_read(Restaurant))
+            ReplicaRouter().db_for_write(Restaurant)
+            seen.append(ReplicaRouter().db_for_read(Restaurant))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(RequestFactory().get("/"))
+        self.assertEqual(seen, ["replica1", "default"])
+
+    def test_without_replicas(self, replicas):
+        replicas.return_value = []
+        api_list = RestaurantViewSet.as_view({"get": "list"})
+        self.assertEqual(self.request(api_list)[0], "default")
+        self.assertFalse(ReplicaRouter().allow_migrate("replica1", "restaurants"))
+
+
+class FakeRelay:
+    """Mail connection whose open()/sends fail on demand; records nesting of DB transactions."""
+
+    def __init__(self, down=False, reject=()):
+        self.down = down
+        self.reject = set(reject)
+        self.sent = []
+        self.savepoints = []
+
+    def open(self):
+        if self.down:
+            raise ConnectionRefusedError("relay down")
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        self.savepoints.append(len(connection.savepoint_ids))
+        for message in messages:
+            if message.subject in self.reject:
+                raise OSError("rejected")
+            self.sent.append(message.subject)
+        return len(messages)
+
+
+@override_settings(OUTBOX_RETRY_BASE=30, OUTBOX_RETRY_MAX=100, OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(TestCase):
+    """accounts/outbox.py: leases, backoff and dead-lettering."""
+
+    def queue(self, *subjects):
+        return [enqueue_mail(subject, "body", ["guest@example.com"]) for subject in subjects]
+
+    def make_due(self):
+        OutboxEmail.objects.filter(status=OutboxEmail.Status.PENDING).update(next_attempt_at=timezone.now())
+
+    def test_retry_delay(self):
+        self.assertEqual([retry_delay(n).total_seconds() for n in (1, 2, 3, 4)], [30, 60, 100, 100])
+
+    def test_sends_outside_the_claiming_transaction(self):
+        self.queue("a", "b")
+        relay = FakeRelay()
+        outside = len(connection.savepoint_ids)
+        self.assertEqual(deliver_batch(connection=relay), (2, 0))
+        self.assertEqual(relay.sent, ["a", "b"])
+        self.assertEqual(relay.savepoints, [outside, outside])
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("status", "attempts")), {(OutboxEmail.Status.SENT, 1)}
+        )
+
+    def test_claimed_rows_are_leased(self):
+        self.queue("a")
+        self.assertEqual(len(_claim(10)), 1)
+        self.assertEqual(_claim(10), [])  # another worker finds nothing due
+        self.assertEqual(deliver_batch(connection=FakeRelay()), (0, 0))
+
+    def test_failed_send_backs_off_then_dead_letters(self):
+        self.queue("bounce", "fine")
+        relay = FakeRelay(reject={"bounce"})
+        before = timezone.now()
+        self.assertEqual(deliver_batch(connection=relay), (1, 1))
+        bounce = OutboxEmail.objects.get(subject="bounce")
+        self.assertEqual((bounce.status, bounce.attempts), (OutboxEmail.Status.PENDING, 1))
+        self.assertEqual(bounce.last_error, "OSError: rejected")
+        self.assertGreaterEqual(bounce.next_attempt_at, before + datetime.timedelta(seconds=30))
+
+        with self.assertLogs("accounts.outbox", "ERROR"):
+            for _ in range(2):
+                self.make_due()
+                deliver_batch(connection=relay)
+        bounce.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.attempts), (OutboxEmail.Status.DEAD, 3))
+        self.make_due()
+        self.assertEqual(deliver_batch(connection=relay), (0, 0))  # dead rows are left alone
+
+    def test_relay_down_counts_as_an_attempt(self):
+        self.queue("a", "b")
+        relay = FakeRelay(down=True)
+        with self.assertLogs("accounts.outbox", "WARNING"):
+            self.assertEqual(deliver_batch(connection=relay), (0, 2))
+        self.assertEqual(deliver_batch(connection=relay), (0, 0))  # backing off, not spinning
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("attempts", "last_error")),
+            {(1, "ConnectionRefusedError: relay down")},
+        )
+        with self.assertLogs("accounts.outbox", "WARNING"):
+            for _ in range(2):
+                self.make_due()
+                deliver_batch(connection=relay)
+        self.assertEqual(set(OutboxEmail.objects.values_list("status", flat=True)), {OutboxEmail.Status.DEAD})
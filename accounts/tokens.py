@@ -0,0 +1,111 @@
+"""
+Stateless signed tokens for the REST API.
+
+- Access tokens are TimestampSigner-signed claims (uid, role, staff) that
+  expire after API_ACCESS_TOKEN_TTL. Verifying one needs no database: safe
+  (read) requests get a TokenUser built from the claims alone.
+- Unsafe requests load the real user (through the cached EmailBackend.get_user)
+  so ownership checks and serializer.save(owner=...) see a model instance.
+- Refresh tokens live for API_REFRESH_TOKEN_TTL and carry a fingerprint of the
+  password hash, so a password change revokes every refresh token of that user.
+  Exchanging one costs a single user lookup.
+"""
+from django.conf import settings
+from django.core.signing import BadSignature, SignatureExpired, TimestampSigner
+from django.utils.crypto import constant_time_compare, salted_hmac
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.permissions import SAFE_METHODS
+
+from .auth_backend import EmailBackend
+from .models import User
+
+ACCESS_SALT = "accounts.api.access"
+REFRESH_SALT = "accounts.api.refresh"
+
+
+def _password_fingerprint(user):
+    return salted_hmac(REFRESH_SALT, user.password).hexdigest()[:16]
+
+
+def issue_tokens(user):
+    access = TimestampSigner(salt=ACCESS_SALT).sign_object(
+        {"uid": user.pk, "role": user.role, "staff": user.is_staff}
+    )
+    refresh = TimestampSigner(salt=REFRESH_SALT).sign_object(
+        {"uid": user.pk, "pwd": _password_fingerprint(user)}
+    )
+    return {
+        "access": access,
+        "refresh": refresh,
+        "token_type": "Bearer",
+        "expires_in": settings.API_ACCESS_TOKEN_TTL,
+    }
+
+
+def read_access_token(token):
+    """Claims of a valid access token, or None."""
+    try:
+        return TimestampSigner(salt=ACCESS_SALT).unsign_object(token, max_age=settings.API_ACCESS_TOKEN_TTL)
+    except (BadSignature, SignatureExpired, ValueError):
+        return None
+
+
+def user_for_refresh_token(token):
+    """The active user a refresh token was issued to, or None."""
+    try:
+        claims = TimestampSigner(salt=REFRESH_SALT).unsign_object(token, max_age=settings.API_REFRESH_TOKEN_TTL)
+    except (BadSignature, SignatureExpired, ValueError):
+        return None
+    user = User.objects.filter(pk=claims.get("uid"), is_active=True).first()
+    if user is None or not constant_time_compare(claims.get("pwd", ""), _password_fingerprint(user)):
+        return None
+    return user
+
+
+class TokenUser:
+    """request.user for token-authenticated reads; built from claims, no DB row."""
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_superuser = False
+
+    def __init__(self, claims):
+        self.pk = self.id = claims["uid"]
+        self.role = claims.get("role", "")
+        self.is_staff = bool(claims.get("staff"))
+
+    def __str__(self):
+        return f"user:{self.pk}"
+
+    def get_username(self):
+        return str(self)
+
+    def has_perm(self, perm, obj=None):
+        return False
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """`Authorization: Bearer <access token>`; no CSRF, no session lookup."""
+
+    keyword = b"bearer"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword:
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Invalid Authorization header.")
+        claims = read_access_token(auth[1].decode("latin-1"))
+        if claims is None:
+            raise exceptions.AuthenticationFailed("Invalid or expired access token.")
+        if request.method in SAFE_METHODS:
+            return TokenUser(claims), claims
+        user = EmailBackend().get_user(claims["uid"])
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        return user, claims
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
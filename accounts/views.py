@@ -4,8 +4,9 @@ from urllib.parse import urlparse  # ✅ ADDED
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.core.mail import send_mail
+from django.db import transaction
 from django.db.models import Q
+from django.db.models.functions import Lower
 from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, resolve  # ✅ ADDED resolve
@@ -14,17 +15,20 @@ from django.utils.timesince import timesince
 from django.utils.http import url_has_allowed_host_and_scheme  # ✅ ADDED
 from django.views.decorators.http import require_POST
 
-from .forms import LoginForm, SignupForm
+from .forms import BulkInviteForm, LoginForm, SignupForm
 from .models import StaffInvitation, User
+from .outbox import enqueue_mail, enqueue_many
 from restaurants.forms import ReservationForm
+from restaurants.cache import attach_card_versions, viewer_role
 from restaurants.models import Reservation, Restaurant
+from config.throttling import throttle
 
 #RX12F4P7X4FMXJCAZJM5963U
 
 def _send_verification_email(user, request):
     token = user.make_email_token()
     link = request.build_absolute_uri(reverse("verify_email") + f"?token={token}")
-    send_mail(
+    enqueue_mail(
         subject="Verify your Bookify email",
         message=(
             f"Hi {user.first_name or ''},\n\n"
@@ -47,14 +51,15 @@ def signup_view(request):
 
         form = SignupForm(request.POST)
         if form.is_valid():
-            user = User.objects.create_user(
-                email=form.cleaned_data["email"],
-                password=form.cleaned_data["password1"],
-                first_name=form.cleaned_data["first_name"],
-                last_name=form.cleaned_data["last_name"],
-                role=form.cleaned_data["role"],
-            )
-            _send_verification_email(user, request)
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=form.cleaned_data["email"],
+                    password=form.cleaned_data["password1"],
+                    first_name=form.cleaned_data["first_name"],
+                    last_name=form.cleaned_data["last_name"],
+                    role=form.cleaned_data["role"],
+                )
+                _send_verification_email(user, request)
             return render(
                 request,
                 "accounts/verify_prompt.html",
@@ -195,6 +200,13 @@ def is_owner(u):
     return u.is_authenticated and u.role == User.Roles.OWNER
 
 
+def _invite_message(request, inv):
+    link = request.build_absolute_uri(
+        reverse("accept_invite") + f"?token={inv.token}"
+    )
+    return "Your Bookify staff invite", f"Open this link to join: {link}"
+
+
 @login_required
 @user_passes_test(is_owner)
 def create_invitation_view(request):
@@ -220,25 +232,72 @@ def create_invitation_view(request):
                 request, f"An active invite already exists for {email}."
             )
             return redirect("owner_dashboard")
-        inv = StaffInvitation.new_invite(
-            email=email,
-            invited_by=request.user,
-            restaurant=restaurant,
-        )
-        link = request.build_absolute_uri(
-            reverse("accept_invite") + f"?token={inv.token}"
-        )
-        send_mail(
-            subject="Your Bookify staff invite",
-            message=f"Open this link to join: {link}",
-            from_email=None,
-            recipient_list=[email],
-        )
+        with transaction.atomic():
+            inv = StaffInvitation.new_invite(
+                email=email,
+                invited_by=request.user,
+                restaurant=restaurant,
+            )
+            subject, body = _invite_message(request, inv)
+            enqueue_mail(
+                subject=subject,
+                message=body,
+                from_email=None,
+                recipient_list=[email],
+            )
         messages.success(request, f"Invitation sent to {email}")
         return redirect("owner_dashboard")
     return render(request, "accounts/create_invite.html")
 
 
+@login_required
+@user_passes_test(is_owner)
+def bulk_invite_view(request):
+    """
+    Owner invites many staff at once (pasted list or CSV).
+    One query finds addresses that already have an active invite; the rest
+    are inserted with bulk_create and their emails queued in the same
+    transaction.
+    """
+    restaurant = Restaurant.objects.filter(owner=request.user).first()
+    if restaurant is None:
+        messages.error(request, "Create your restaurant before inviting staff.")
+        return redirect("owner_restaurant_create")
+
+    if request.method == "POST":
+        form = BulkInviteForm(request.POST, request.FILES)
+        if form.is_valid():
+            emails = form.cleaned_data["emails"]
+            # The form lower-cases; single invites keep the address as typed
+            already = set(
+                StaffInvitation.objects.annotate(email_lower=Lower("email"))
+                .filter(
+                    invited_by=request.user,
+                    email_lower__in=emails,
+                    accepted_at__isnull=True,
+                    expires_at__gt=timezone.now(),
+                )
+                .values_list("email_lower", flat=True)
+            )
+            new = [e for e in emails if e not in already]
+            with transaction.atomic():
+                invites = StaffInvitation.bulk_invite(
+                    emails=new, invited_by=request.user, restaurant=restaurant
+                )
+                enqueue_many(
+                    (*_invite_message(request, inv), [inv.email]) for inv in invites
+                )
+            messages.success(request, f"Invited {len(new)} staff members.")
+            if already:
+                messages.warning(
+                    request, f"Skipped {len(already)} address(es) with an active invite."
+                )
+            return redirect("owner_dashboard")
+    else:
+        form = BulkInviteForm()
+    return render(request, "accounts/bulk_invite.html", {"form": form})
+
+
 def accept_invite_view(request):
     """Staff accepts invitation and sets a password."""
     token = (
@@ -284,6 +343,7 @@ def accept_invite_view(request):
 
 
 @login_required
+@throttle("reservation")
 def customer_dashboard(request):
     if request.user.role != User.Roles.CUSTOMER:
         return HttpResponseForbidden("403")
@@ -299,7 +359,7 @@ def customer_dashboard(request):
             | Q(address__icontains=search_query)
         )
     restaurants_qs = restaurants_qs.order_by("name")
-    restaurants_list = list(restaurants_qs)
+    restaurants_list = attach_card_versions(list(restaurants_qs))
 
     reservation_form_with_errors = None    # a ReservationForm with errors, or None
     active_restaurant_id = None            # which card should show the errors
@@ -423,6 +483,7 @@ def customer_dashboard(request):
         "upcoming_reservations": upcoming,
         "past_reservations": past[:5],
         "active_restaurant_id": active_restaurant_id,
+        "viewer_role": viewer_role(request.user),
     }
     return render(request, "accounts/dashboard_customer.html", context)
 
@@ -563,9 +624,19 @@ def owner_dashboard(request):
     tz = timezone.get_current_timezone()
     now_local = timezone.localtime()
 
+    # Only today onwards and the statuses shown below (past / declined are
+    # dropped anyway); served by resv_rest_status_date_idx
     reservations_qs = (
         Reservation.objects.select_related("customer", "restaurant")
-        .filter(restaurant__owner=request.user)
+        .filter(
+            restaurant__owner=request.user,
+            reservation_date__gte=now_local.date(),
+            status__in=(
+                Reservation.Status.PENDING,
+                Reservation.Status.CONFIRMED,
+                Reservation.Status.CANCELLED,
+            ),
+        )
         .order_by("reservation_date", "reservation_time")
     )
 
@@ -615,6 +686,7 @@ def owner_dashboard(request):
     context = {
         "restaurant": restaurant,
         "has_restaurant": has_restaurant,
+        "covers_today": restaurant.confirmed_covers_today if restaurant else 0,
         "opening_hours_rows": opening_hours_rows,
         "active_invites": active_invites,
         "expired_invites": expired_invites[:3],
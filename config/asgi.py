@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Route the public read views to their async versions (restaurants/async_views.py)
+os.environ.setdefault("ASYNC_PUBLIC_VIEWS", "True")
 
 application = get_asgi_application()
@@ -0,0 +1,36 @@
+"""
+Database connection metrics for the current worker process.
+
+- With DB_POOL_MODE=pool each alias reports its psycopg pool statistics
+  (pool_size, pool_available, requests_waiting, requests_wait_ms,
+  connections_lost, ...; see psycopg_pool's get_stats()).
+- In the other modes it reports whether the worker currently holds a
+  connection, which is what counts against Postgres max_connections.
+"""
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+
+def pool_stats():
+    stats = {}
+    for alias in connections:
+        conn = connections[alias]
+        pool = getattr(conn, "pool", None)  # Django 5.1+, None unless OPTIONS["pool"]
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+        else:
+            stats[alias] = {
+                "connected": conn.connection is not None,
+                "conn_max_age": conn.settings_dict["CONN_MAX_AGE"],
+            }
+    return stats
+
+
+@staff_member_required
+@require_GET
+def pool_stats_view(request):
+    """JSON snapshot of this worker's connection pool(s)."""
+    return JsonResponse({"mode": settings.DB_POOL_MODE, "databases": pool_stats()})
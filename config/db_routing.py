@@ -0,0 +1,130 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+- Replicas come from DATABASE_REPLICA_URLS (settings: DATABASES["replica1"], ...).
+- Only views that opt in read from a replica: function views decorated with
+  @replica_reads, class-based views with `replica_reads = True`, and DRF
+  viewsets for the actions listed in `replica_actions`. Everything else,
+  and every write, uses "default". Views whose output is cached under a
+  version that a write bumps (restaurants/cache.py) must not opt in: a
+  lagging replica would have its stale copy cached under the new version.
+- ReplicaRoutingMiddleware marks the request while such a view runs (in a
+  ContextVar, so it is per-request under threads and asyncio alike).
+- Any write to app data sets a short-lived cookie; while it is present the
+  browser's requests read from the primary too, so a user sees their own
+  reservation / rating / edit immediately despite replica lag.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+_read_from_replica = ContextVar("read_from_replica", default=False)
+_wrote = ContextVar("wrote_to_primary", default=None)
+
+# Writes to these apps don't pin (sessions are saved on many plain reads)
+UNPINNED_APPS = {"sessions"}
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+def replica_reads(view_func):
+    """Let a (read-only) function view run its queries on a replica."""
+    view_func.replica_reads = True
+    return view_func
+
+
+def _wants_replica(request, view_func):
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if getattr(view_func, "replica_reads", False):
+        return True
+    view_class = getattr(view_func, "view_class", None)
+    if view_class is not None:
+        return getattr(view_class, "replica_reads", False)
+    actions = getattr(view_func, "actions", None)  # DRF viewset
+    if actions:
+        return actions.get(request.method.lower()) in getattr(view_func.cls, "replica_actions", ())
+    return False
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        wrote = _wrote.set([False])
+        try:
+            response = self.get_response(request)
+        finally:
+            pinned = self._reset(request, wrote)
+        return self._pin(response, pinned)
+
+    async def _acall(self, request):
+        wrote = _wrote.set([False])
+        try:
+            response = await self.get_response(request)
+        finally:
+            pinned = self._reset(request, wrote)
+        return self._pin(response, pinned)
+
+    @staticmethod
+    def _reset(request, wrote):
+        if getattr(request, "_replica_reads", False):
+            # Not Token.reset(): under ASGI process_view ran in a copied context
+            _read_from_replica.set(False)
+        pinned = _wrote.get()[0]
+        _wrote.reset(wrote)
+        return pinned
+
+    @staticmethod
+    def _pin(response, pinned):
+        if pinned:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            replicas()
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+            and _wants_replica(request, view_func)
+        ):
+            request._replica_reads = True
+            _read_from_replica.set(True)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        wrote = _wrote.get()
+        if _read_from_replica.get() and not (wrote and wrote[0]):
+            choices = replicas()
+            if choices:
+                return random.choice(choices)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        flag = _wrote.get()
+        if flag is not None and model._meta.app_label not in UNPINNED_APPS:
+            flag[0] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same data as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,80 @@
+"""
+Gunicorn settings shared by every service (gunicorn -c config/gunicorn.conf.py).
+
+SERVER_MODE=asgi serves config.asgi with uvicorn workers, which routes the
+public read views to their async versions (restaurants/async_views.py);
+the default is config.wsgi with threaded sync workers.
+
+Sizing: WEB_CONCURRENCY workers (default 2 x CPUs + 1, counting the
+container's cgroup CPU quota rather than the host's cores) with
+GUNICORN_THREADS threads each (default 2; uvicorn workers ignore it).
+
+Startup: the app is loaded and warmed (config/warmup.py: URL resolvers,
+compiled templates) once in the master before any worker is forked
+(PRELOAD_APP, default on), so workers share that memory and the first
+requests after a rollout don't pay for it. With PRELOAD_APP=False each
+worker warms itself before it accepts connections.
+
+Metrics: each worker writes its samples to PROMETHEUS_MULTIPROC_DIR, which is
+wiped when the master starts and cleaned up per worker when one exits, so
+/metrics on any worker reports the whole pod (see config/metrics.py).
+"""
+import math
+import os
+import shutil
+import tempfile
+
+if os.environ.get("SERVER_MODE") == "asgi":
+    wsgi_app = "config.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "config.wsgi:application"
+
+
+def _cpus():
+    try:
+        quota, period = open("/sys/fs/cgroup/cpu.max").read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0))
+
+
+workers = int(os.environ.get("WEB_CONCURRENCY", _cpus() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 2))
+preload_app = os.environ.get("PRELOAD_APP", "True").lower() in ("1", "true", "yes", "on")
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "bookify-metrics"))
+
+
+def on_starting(server):
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)  # stale files from a previous run
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    # Master, after the preload and before the first fork
+    if server.cfg.preload_app:
+        _warm_up(server.log)
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        _warm_up(worker.log)
+
+
+def _warm_up(log):
+    from django.db import connections
+
+    from config.warmup import warm_up
+
+    log.info("Warmed %d URL patterns and %d templates in %.2fs", *warm_up())
+    connections.close_all()  # never hand an open connection to forked workers
@@ -0,0 +1,205 @@
+"""
+Prometheus metrics, served at /metrics.
+
+- MetricsMiddleware times every request per URL name (view_name) and counts
+  the SQL queries it ran; query durations are observed for every statement
+  on every connection (connection_created hook), background threads included.
+- InstrumentedDjangoTemplates (the TEMPLATES backend) times top-level renders.
+- Cache hit/miss is counted by the page cache (restaurants/cache.py) and the
+  user cache (accounts/auth_backend.py) through record_cache().
+- Reservation throughput is counted in restaurants/signals.py; outbox depth is
+  read from the database at scrape time.
+- Under gunicorn, config/gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR so every
+  worker writes its samples there and a scrape of any worker returns the sum.
+  Without it (runserver, tests) the process's own registry is served.
+"""
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+REQUEST_LATENCY = Histogram(
+    "bookify_http_request_duration_seconds",
+    "Request latency by URL name.",
+    ["view", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "bookify_http_request_db_queries",
+    "SQL queries run per request, by URL name.",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+QUERY_LATENCY = Histogram(
+    "bookify_db_query_duration_seconds",
+    "SQL statement duration by database alias.",
+    ["alias"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+TEMPLATE_RENDER = Histogram(
+    "bookify_template_render_seconds",
+    "Template render time by template name.",
+    ["template"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+CACHE_REQUESTS = Counter(
+    "bookify_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss).",
+    ["cache", "result"],
+)
+RESERVATIONS = Counter(
+    "bookify_reservations_total",
+    "Reservations created / moved to a status.",
+    ["status"],
+)
+
+_request_queries = ContextVar("request_queries", default=None)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_reservation(status):
+    RESERVATIONS.labels(status).inc()
+
+
+# ---------- SQL ----------
+def _observe_query(alias):
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            QUERY_LATENCY.labels(alias).observe(time.perf_counter() - start)
+            counter = _request_queries.get()
+            if counter is not None:
+                counter[0] += 1
+
+    return wrapper
+
+
+def _instrument_connection(sender, connection, **kwargs):
+    # connection_created fires again each time a DatabaseWrapper reconnects
+    # (CONN_MAX_AGE expiry, errors), but execute_wrappers lives on the wrapper
+    if getattr(connection, "_metrics_instrumented", False):
+        return
+    # First in the list, out of the way of execute_wrapper() blocks (such as
+    # query_budget.track_queries) that are open right now: they pop the last one
+    connection.execute_wrappers.insert(0, _observe_query(connection.alias))
+    connection._metrics_instrumented = True
+
+
+connection_created.connect(_instrument_connection, dispatch_uid="config.metrics")
+
+
+# ---------- Requests ----------
+class MetricsMiddleware:
+    sync_capable = async_capable = True  # no thread hop in front of async views
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        queries, token, start = self._begin()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self._end(request, status, queries, token, start)
+
+    async def _acall(self, request):
+        queries, token, start = self._begin()
+        status = 500
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self._end(request, status, queries, token, start)
+
+    @staticmethod
+    def _begin():
+        queries = [0]
+        return queries, _request_queries.set(queries), time.perf_counter()
+
+    @staticmethod
+    def _end(request, status, queries, token, start):
+        _request_queries.reset(token)
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        REQUEST_LATENCY.labels(view, request.method, status).observe(time.perf_counter() - start)
+        REQUEST_QUERIES.labels(view).observe(queries[0])
+
+
+# ---------- Templates ----------
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            TEMPLATE_RENDER.labels(self.template.origin.template_name).observe(time.perf_counter() - start)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates whose get_template() results record their render time."""
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# ---------- Scrape-time gauges ----------
+class OutboxCollector:
+    """Email outbox depth per status, counted when scraped."""
+
+    def collect(self):
+        from accounts.models import OutboxEmail
+
+        gauge = GaugeMetricFamily("bookify_outbox_emails", "Outbox rows by status.", labels=["status"])
+        counts = dict(OutboxEmail.objects.values_list("status").annotate(n=Count("id")).order_by())
+        for status in OutboxEmail.Status.values:
+            gauge.add_metric([status], counts.get(status, 0))
+        yield gauge
+
+
+def metrics_view(request):
+    """
+    Prometheus exposition; needs `Authorization: Bearer METRICS_TOKEN`.
+    Without a METRICS_TOKEN the endpoint doesn't exist: /metrics is routed
+    through the public ingress like every other path.
+    """
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+        return HttpResponseForbidden("403")
+    registry = CollectorRegistry()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(OutboxCollector())
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
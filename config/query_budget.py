@@ -0,0 +1,143 @@
+"""
+Per-view query budgets and N+1 detection.
+
+- track_queries() counts the queries (and SQL time) run on every database
+  alias inside the block and groups them by SQL shape: parameters are already
+  placeholders, IN (...) lists and inlined numbers are collapsed, so one shape
+  executed many times is an N+1 loop.
+- Budgets are per URL name in settings.QUERY_BUDGETS, on top of
+  QUERY_BUDGET_DEFAULT: "queries" (total), "ms" (total SQL time) and
+  "repeats" (executions allowed per shape).
+- QueryBudgetMiddleware measures a sample of requests
+  (QUERY_BUDGET_SAMPLE_RATE) and logs the ones over budget with the shapes
+  that repeat (under ASGI too). Queries run while a streaming response is
+  consumed are not seen.
+- QueryBudgetTestMixin.assertWithinQueryBudget() fails a test instead.
+"""
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACE = re.compile(r"\s+")
+
+
+def sql_shape(sql):
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _NUMBER.sub("N", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """execute_wrapper that tallies what went through it."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    @property
+    def ms(self):
+        return self.seconds * 1000
+
+    def repeated(self, limit):
+        """(shape, times) for shapes run more than `limit` times, worst first."""
+        return [(shape, times) for shape, times in self.shapes.most_common() if times > limit]
+
+    def violations(self, budget):
+        problems = []
+        if self.count > budget["queries"]:
+            problems.append(f"{self.count} queries (budget {budget['queries']})")
+        if self.ms > budget["ms"]:
+            problems.append(f"{self.ms:.0f}ms of SQL (budget {budget['ms']}ms)")
+        for shape, times in self.repeated(budget["repeats"]):
+            problems.append(f"{times}x {shape[:300]}")
+        return problems
+
+
+def budget_for(url_name):
+    return {**settings.QUERY_BUDGET_DEFAULT, **settings.QUERY_BUDGETS.get(url_name, {})}
+
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        yield stats
+
+
+class QueryBudgetMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        if random.random() >= settings.QUERY_BUDGET_SAMPLE_RATE:
+            return self.get_response(request)
+        with track_queries() as stats:
+            response = self.get_response(request)
+        self._report(request, stats)
+        return response
+
+    async def _acall(self, request):
+        if random.random() >= settings.QUERY_BUDGET_SAMPLE_RATE:
+            return await self.get_response(request)
+        # The async ORM runs on the request's sync thread: install the wrappers there
+        tracker = track_queries()
+        stats = await sync_to_async(tracker.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(tracker.__exit__)(None, None, None)
+        self._report(request, stats)
+        return response
+
+    @staticmethod
+    def _report(request, stats):
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        problems = stats.violations(budget_for(url_name))
+        if problems:
+            logger.warning(
+                "Query budget exceeded by %s %s (%s): %s",
+                request.method, request.path, url_name, "; ".join(problems),
+            )
+
+
+class QueryBudgetTestMixin:
+    """For TestCase: make a request and fail if its view goes over budget."""
+
+    def assertWithinQueryBudget(self, path, method="get", **kwargs):
+        with track_queries() as stats:
+            response = getattr(self.client, method)(path, **kwargs)
+        url_name = response.resolver_match.view_name
+        problems = stats.violations(budget_for(url_name))
+        if problems:
+            self.fail(f"{url_name} is over its query budget:\n  " + "\n  ".join(problems))
+        return response
@@ -1,8 +1,11 @@
 from pathlib import Path
 import environ
 import os
+import tempfile
 from dotenv import load_dotenv
 import dj_database_url
+import django
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -41,7 +44,11 @@ AUTH_USER_MODEL = "accounts.User"
 # MIDDLEWARE
 # ---------------------------------------------------------------------
 MIDDLEWARE = [
+    "config.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "config.db_routing.ReplicaRoutingMiddleware",
+    "config.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -55,13 +62,17 @@ MIDDLEWARE = [
 # ---------------------------------------------------------------------
 ROOT_URLCONF = "config.urls"  
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+# Public read views as async views (restaurants/async_views.py); config/asgi.py
+# turns this on, since under WSGI every async view would start its own event loop
+ASYNC_PUBLIC_VIEWS = env.bool("ASYNC_PUBLIC_VIEWS", default=False)
 
 # ---------------------------------------------------------------------
 # TEMPLATES
 # ---------------------------------------------------------------------
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "config.metrics.InstrumentedDjangoTemplates",  # DjangoTemplates + render timing
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -78,15 +89,161 @@ TEMPLATES = [
 # ---------------------------------------------------------------------
 # DATABASE
 # ---------------------------------------------------------------------
+# How each worker process holds its connections (DB_POOL_MODE); sizes are set
+# per service through that deployment's environment:
+#   persistent - one connection per worker thread, reused for DB_CONN_MAX_AGE
+#                seconds and health-checked before reuse
+#   pool       - psycopg pool inside each worker (Django 5.1+), between
+#                DB_POOL_MIN_SIZE and DB_POOL_MAX_SIZE connections
+#   pgbouncer  - DATABASE_URL points at PgBouncer in transaction mode: no
+#                server-side cursors, no server-side binding (prepared statements)
+DB_POOL_MODE = env.str("DB_POOL_MODE", default="persistent")
+DB_CONN_MAX_AGE = env.int("DB_CONN_MAX_AGE", default=600)
+DB_CONN_HEALTH_CHECKS = env.bool("DB_CONN_HEALTH_CHECKS", default=True)
+
 DATABASES = {
     "default": dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
-        conn_max_age=600,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
 }
 
-if DATABASES["default"]["ENGINE"].endswith("postgresql") and "OPTIONS" not in DATABASES["default"]:
-    DATABASES["default"]["OPTIONS"] = {"sslmode": "require"}
+# Read replicas (comma-separated URLs) for views that opt in, see config/db_routing.py
+for _i, _url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), start=1):
+    DATABASES[f"replica{_i}"] = {
+        **dj_database_url.parse(_url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DB_CONN_HEALTH_CHECKS),
+        "TEST": {"MIRROR": "default"},
+    }
+
+if DB_POOL_MODE not in ("persistent", "pool", "pgbouncer"):
+    raise ImproperlyConfigured(f"Unknown DB_POOL_MODE {DB_POOL_MODE!r}")
+if DB_POOL_MODE == "pool" and django.VERSION < (5, 1):
+    raise ImproperlyConfigured("DB_POOL_MODE=pool needs Django 5.1+ (use pgbouncer or persistent)")
+
+for _db in DATABASES.values():
+    if not _db["ENGINE"].endswith("postgresql"):
+        continue
+    _db.setdefault("OPTIONS", {"sslmode": "require"})
+    if DB_POOL_MODE == "pool":
+        from psycopg_pool import ConnectionPool
+
+        _db["CONN_MAX_AGE"] = 0  # the pool owns connection lifetime
+        _db["OPTIONS"]["pool"] = {
+            "min_size": env.int("DB_POOL_MIN_SIZE", default=2),
+            "max_size": env.int("DB_POOL_MAX_SIZE", default=10),
+            "timeout": env.float("DB_POOL_TIMEOUT", default=10.0),  # wait for a free connection
+            "max_idle": env.float("DB_POOL_MAX_IDLE", default=300.0),
+            "max_lifetime": env.float("DB_POOL_MAX_LIFETIME", default=1800.0),
+            "check": ConnectionPool.check_connection,  # ping before handing a connection out
+        }
+    elif DB_POOL_MODE == "pgbouncer":
+        # A transaction-mode pooler can't keep cursors or prepared statements
+        # across transactions; exports fall back to keyset pages (restaurants/exports.py)
+        _db["DISABLE_SERVER_SIDE_CURSORS"] = True
+        _db["OPTIONS"]["server_side_binding"] = False
+
+DATABASE_ROUTERS = ["config.db_routing.ReplicaRouter"]
+# After a write, the browser reads from the primary for this long (replica lag)
+REPLICA_PIN_COOKIE = "db_pin"
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=15)
+
+# ---------------------------------------------------------------------
+# QUERY BUDGETS (config/query_budget.py): per URL name, over the defaults;
+# over-budget requests are logged, and fail QueryBudgetTestMixin tests
+# ---------------------------------------------------------------------
+QUERY_BUDGET_DEFAULT = {"queries": 20, "ms": 500, "repeats": 2}
+QUERY_BUDGETS = {
+    "restaurant_browse": {"queries": 4},
+    "restaurant_detail": {"queries": 4},
+    "customer_dashboard": {"queries": 6},
+    "owner_dashboard": {"queries": 8},
+    "restaurant-list": {"queries": 4},
+}
+QUERY_BUDGET_SAMPLE_RATE = env.float("QUERY_BUDGET_SAMPLE_RATE", default=1.0 if DEBUG else 0.02)
+
+# ---------------------------------------------------------------------
+# METRICS (config/metrics.py, scraped at /metrics)
+# ---------------------------------------------------------------------
+# Shared secret; scrapes need "Authorization: Bearer <token>". /metrics answers
+# 404 while it is unset (it is reachable through the public ingress)
+METRICS_TOKEN = env.str("METRICS_TOKEN", default="")
+
+# ---------------------------------------------------------------------
+# CACHE (local memory for dev; set CACHE_URL=redis://... in prod so all
+# workers and pods share it)
+# ---------------------------------------------------------------------
+CACHES = {
+    "default": env.cache_url("CACHE_URL", default="locmemcache://bookify"),
+}
+
+# Anonymous browse/detail pages (see restaurants/cache.py)
+PAGE_CACHE_ALIAS = "default"
+PAGE_CACHE_TIMEOUT = env.int("PAGE_CACHE_TIMEOUT", default=600)
+
+# Logged-in user objects (see accounts.auth_backend.EmailBackend.get_user)
+USER_CACHE_ALIAS = "default"
+USER_CACHE_TIMEOUT = env.int("USER_CACHE_TIMEOUT", default=300)
+
+# ---------------------------------------------------------------------
+# SESSIONS (cache first, lazily written behind to django_session)
+# ---------------------------------------------------------------------
+SESSION_ENGINE = "accounts.sessions"
+SESSION_CACHE_ALIAS = "default"
+SESSION_DB_WRITE_INTERVAL = env.int("SESSION_DB_WRITE_INTERVAL", default=300)
+
+# ---------------------------------------------------------------------
+# THROTTLING (token buckets, see config/throttling.py)
+# ---------------------------------------------------------------------
+THROTTLE_CACHE_ALIAS = "default"
+THROTTLE_RATES = {
+    "api_read": env("THROTTLE_API_READ", default="300/min"),
+    "api_search": env("THROTTLE_API_SEARCH", default="60/min"),
+    "api_write": env("THROTTLE_API_WRITE", default="30/min"),
+    "rating": env("THROTTLE_RATING", default="10/min"),
+    "reservation": env("THROTTLE_RESERVATION", default="20/min"),
+    "api_token": env("THROTTLE_API_TOKEN", default="10/min"),
+}
+
+# ---------------------------------------------------------------------
+# SHARED CACHE: state that every worker and pod must see the same way.
+# A per-process locmem cache would silently split it per worker, so outside
+# DEBUG each of these needs CACHE_URL=redis://... (k8s/redis-service.yaml)
+# ---------------------------------------------------------------------
+SHARED_CACHE_USERS = {
+    "throttle buckets": THROTTLE_CACHE_ALIAS,
+    # a version bump must reach every worker, or the others keep serving
+    # stale pages for PAGE_CACHE_TIMEOUT
+    "page cache versions": PAGE_CACHE_ALIAS,
+    # dropping a saved user's entry must reach every worker, or old sessions
+    # keep validating against the old password hash / active flag there
+    "cached users": USER_CACHE_ALIAS,
+    # a logout / flush() deletes the cached session on every worker at once
+    "sessions": SESSION_CACHE_ALIAS,
+}
+if not DEBUG:
+    for _what, _alias in SHARED_CACHE_USERS.items():
+        if CACHES[_alias]["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache":
+            raise ImproperlyConfigured(
+                f"The {_what} need a cache shared by all workers, but cache {_alias!r} "
+                "is per-process local memory: set CACHE_URL=redis://..."
+            )
+
+# ---------------------------------------------------------------------
+# EXPORTS (rows fetched and flushed per chunk when streaming CSV/NDJSON)
+# ---------------------------------------------------------------------
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)
+
+# ---------------------------------------------------------------------
+# PHOTO UPLOADS (streamed to disk, processed by a background thread pool)
+# ---------------------------------------------------------------------
+FILE_UPLOAD_HANDLERS = ["restaurants.uploads.LimitedTemporaryFileUploadHandler"]
+PHOTO_UPLOAD_MAX_BYTES = env.int("PHOTO_UPLOAD_MAX_BYTES", default=10 * 1024 * 1024)
+PHOTO_MAX_PIXELS = env.int("PHOTO_MAX_PIXELS", default=40_000_000)
+PHOTO_WORKERS = env.int("PHOTO_WORKERS", default=2)
+PHOTO_STAGING_DIR = env("PHOTO_STAGING_DIR", default=os.path.join(tempfile.gettempdir(), "bookify-uploads"))
+# A queued upload older than this is treated as lost by `sweep_photo_uploads`
+PHOTO_STALE_SECONDS = env.int("PHOTO_STALE_SECONDS", default=900)
 
 # ---------------------------------------------------------------------
 # PASSWORD VALIDATORS
@@ -112,10 +269,31 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
+# collectstatic writes content-hashed copies plus .gz/.br variants; WhiteNoise
+# serves them (pre-compressed, far-future + immutable) straight from gunicorn.
+# In DEBUG the plain storage is kept so no collectstatic is needed.
+STATICFILES_BACKEND = (
+    "django.contrib.staticfiles.storage.StaticFilesStorage"
+    if DEBUG
+    else "whitenoise.storage.CompressedManifestStaticFilesStorage"
+)
+WHITENOISE_MAX_AGE = env.int("WHITENOISE_MAX_AGE", default=3600)  # unhashed names only
 
-
+# ---------------------------------------------------------------------
+# MEDIA (content-addressed: names never change content, see config/storage.py)
+# ---------------------------------------------------------------------
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+STORAGES = {
+    "default": {"BACKEND": "config.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": STATICFILES_BACKEND},
+}
+MEDIA_CACHE_MAX_AGE = env.int("MEDIA_CACHE_MAX_AGE", default=365 * 24 * 3600)
+# Off in production, where the media server sends the immutable caching
+# header itself (see config/storage.py)
+SERVE_MEDIA = env.bool("SERVE_MEDIA", default=DEBUG)
+# gc_media keeps unreferenced files younger than this (uploads still in flight)
+MEDIA_GC_GRACE_SECONDS = env.int("MEDIA_GC_GRACE_SECONDS", default=3600)
 
 # ---------------------------------------------------------------------
 # EMAIL (console backend for dev)
@@ -123,14 +301,45 @@ MEDIA_ROOT = BASE_DIR / "media"
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "no-reply@bookify.local"
 
+# Outbox (accounts/outbox.py): requests only queue mail, `send_outbox` delivers it
+OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", default=50)
+OUTBOX_MAX_ATTEMPTS = env.int("OUTBOX_MAX_ATTEMPTS", default=8)
+OUTBOX_RETRY_BASE = env.int("OUTBOX_RETRY_BASE", default=30)  # seconds, doubled per attempt
+OUTBOX_RETRY_MAX = env.int("OUTBOX_RETRY_MAX", default=6 * 3600)
+# Claimed rows are skipped by other workers for this long while being sent
+OUTBOX_LEASE_SECONDS = env.int("OUTBOX_LEASE_SECONDS", default=300)
+# Without a worker (local dev) deliver right after commit in a background thread
+OUTBOX_DELIVER_IN_PROCESS = env.bool("OUTBOX_DELIVER_IN_PROCESS", default=DEBUG)
+
+# Most addresses accepted by one bulk staff invite import
+INVITE_BULK_MAX = env.int("INVITE_BULK_MAX", default=500)
+
 # ---------------------------------------------------------------------
 # AUTH BACKENDS
 # ---------------------------------------------------------------------
+# EmailBackend extends ModelBackend (permissions included); listing
+# ModelBackend as well would re-query and re-hash every failed login.
 AUTHENTICATION_BACKENDS = [
     "accounts.auth_backend.EmailBackend",
-    "django.contrib.auth.backends.ModelBackend",
 ]
 
+# ---------------------------------------------------------------------
+# REST API AUTH (accounts/tokens.py: signed Bearer tokens, no DB on reads)
+# ---------------------------------------------------------------------
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "accounts.tokens.SignedTokenAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+        "rest_framework.authentication.BasicAuthentication",
+    ],
+    # Client IP for throttling: 0 = REMOTE_ADDR; N = the address our N-th proxy
+    # appended to X-Forwarded-For (1 behind the nginx ingress). Never unset:
+    # DRF would then key on the whole, client-supplied header
+    "NUM_PROXIES": env.int("NUM_PROXIES", default=0),
+}
+API_ACCESS_TOKEN_TTL = env.int("API_ACCESS_TOKEN_TTL", default=5 * 60)
+API_REFRESH_TOKEN_TTL = env.int("API_REFRESH_TOKEN_TTL", default=14 * 24 * 3600)
+
 # ---------------------------------------------------------------------
 # DEFAULT FIELD TYPE
 # ---------------------------------------------------------------------
@@ -0,0 +1,81 @@
+"""
+Content-addressed media storage.
+
+Files are named after a hash of their bytes instead of the uploaded name:
+
+    restaurant_photos/3f2a9c0e1b7d4a5f8e6c2b1a0d9f8e7c.jpg
+
+- Identical uploads map to the same name, so the blob is written once and
+  shared by every row that references it.
+- A name never changes content, so URLs can be cached forever
+  (see serve_media / MEDIA_CACHE_MAX_AGE).
+- Because blobs are shared, nothing deletes them on replace; unreferenced
+  files are removed by `manage.py gc_media`. Saving bytes that are already
+  stored refreshes the blob's mtime, so gc_media's grace period covers a
+  re-used blob just as it covers a new upload.
+
+serve_media only runs when SERVE_MEDIA is on (by default under DEBUG). Where
+another server serves MEDIA_ROOT it has to send the caching header itself,
+for hashed names only, e.g. with nginx:
+
+    location ~ "^/media/(.+/)?[0-9a-f]{32}([.][a-z0-9]+)?$" {
+        root /app;  # the parent of MEDIA_ROOT
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+HASH_LENGTH = 32  # hex chars of sha256 kept in the name (128 bits)
+_HASHED_NAME = re.compile(r"(^|/)[0-9a-f]{%d}(\.[a-z0-9]+)?$" % HASH_LENGTH)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = posixpath.split(name)
+        ext = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest.hexdigest()[:HASH_LENGTH] + ext)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        validate_file_name(name, allow_relative_path=True)
+        if self.exists(name):  # same bytes already stored
+            try:
+                os.utime(self.path(name))  # in use again: restart its gc_media grace period
+                return name
+            except FileNotFoundError:
+                pass  # gc_media removed it in the meantime: store it again
+        # A concurrent writer of the same blob makes _save() pick a suffixed
+        # name; that copy is harmless and gc_media will collect it.
+        name = self._save(self.get_available_name(name, max_length=max_length), content)
+        validate_file_name(name, allow_relative_path=True)
+        return name
+
+
+def serve_media(request, path):
+    """
+    django.views.static.serve with far-future, immutable caching for
+    content-addressed names (files stored before the switch keep the default).
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if _HASHED_NAME.search(path):
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE, immutable=True)
+    return response
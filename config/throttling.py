@@ -0,0 +1,190 @@
+"""
+Token-bucket throttling shared by the REST API and the booking views.
+
+- Buckets live in the cache named by THROTTLE_CACHE_ALIAS, so a limit holds
+  across every gunicorn worker and pod that shares that cache; outside DEBUG
+  settings refuse a per-process locmem cache (k8s uses Redis).
+- Anonymous buckets are keyed by client IP as DRF's NUM_PROXIES sees it,
+  never by a client-supplied X-Forwarded-For.
+- Each bucket is stored as a single number (its GCRA "theoretical arrival
+  time"), which is equivalent to a token bucket of size N refilling at the
+  configured rate. On Redis the check is one EVALSHA round trip; other
+  backends fall back to get/set.
+- If the cache is unreachable we keep throttling with per-process buckets
+  instead of failing open or erroring.
+- Rates come from settings.THROTTLE_RATES, e.g. {"rating": "10/min"}.
+"""
+import logging
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponse
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# KEYS[1] = bucket key, ARGV[1] = ms per token, ARGV[2] = bucket size in ms.
+# Returns 0 when allowed, otherwise the number of ms until a token is free.
+GCRA_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local wait = new_tat - now - burst
+if wait > 0 then return math.ceil(wait) end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return 0
+"""
+
+
+def parse_rate(rate):
+    """'30/min' -> (30, 2000.0): bucket size and milliseconds per token."""
+    num, period = rate.split("/")
+    capacity = int(num)
+    return capacity, PERIODS[period[0]] * 1000 / capacity
+
+
+def _gcra(tat, now, interval, burst):
+    """Pure GCRA step. Returns (new_tat or None if denied, wait_ms)."""
+    tat = max(tat if tat is not None else now, now)
+    new_tat = tat + interval
+    wait = new_tat - now - burst
+    if wait > 0:
+        return None, wait
+    return new_tat, 0
+
+
+class _LocalBuckets:
+    """Per-process fallback used while the shared cache is unavailable."""
+
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tats = {}
+
+    def consume(self, key, interval, burst):
+        now = time.time() * 1000
+        with self._lock:
+            if len(self._tats) > self.MAX_KEYS:
+                self._tats = {k: v for k, v in self._tats.items() if v > now}
+            new_tat, wait = _gcra(self._tats.get(key), now, interval, burst)
+            if new_tat is not None:
+                self._tats[key] = new_tat
+        return wait
+
+
+_local = _LocalBuckets()
+_shared_lock = threading.Lock()
+_last_outage_log = 0.0
+
+
+def consume(scope, ident):
+    """
+    Take one token from the (scope, ident) bucket.
+    Returns 0 if the request may proceed, else seconds until it may retry.
+    """
+    rate = settings.THROTTLE_RATES.get(scope)
+    if not rate:
+        return 0
+    capacity, interval = parse_rate(rate)
+    burst = interval * capacity
+    key = f"throttle:{scope}:{ident}"
+    try:
+        wait = _consume_shared(key, interval, burst)
+    except Exception:
+        _log_outage()
+        wait = _local.consume(key, interval, burst)
+    return wait / 1000
+
+
+def _consume_shared(key, interval, burst):
+    cache = caches[settings.THROTTLE_CACHE_ALIAS]
+    if isinstance(cache, RedisCache):
+        full_key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(full_key, write=True)
+        return int(client.register_script(GCRA_LUA)(keys=[full_key], args=[interval, burst]))
+    # Non-Redis backends (locmem in dev) can't run scripts; serialise per process.
+    with _shared_lock:
+        now = time.time() * 1000
+        new_tat, wait = _gcra(cache.get(key), now, interval, burst)
+        if new_tat is not None:
+            cache.set(key, new_tat, timeout=math.ceil((new_tat - now) / 1000))
+    return wait
+
+
+def _log_outage():
+    global _last_outage_log
+    now = time.monotonic()
+    if now - _last_outage_log > 60:
+        _last_outage_log = now
+        logger.warning("Throttle cache unavailable; using per-process buckets.", exc_info=True)
+
+
+_ident_helper = BaseThrottle()
+
+
+def request_ident(request):
+    """
+    User id when logged in, otherwise client IP: REMOTE_ADDR, or with
+    REST_FRAMEWORK["NUM_PROXIES"] the address our last proxy saw.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{_ident_helper.get_ident(request)}"
+
+
+def throttled_response(wait):
+    response = HttpResponse("Too many requests. Please slow down.", status=429, content_type="text/plain")
+    response["Retry-After"] = str(max(1, math.ceil(wait)))
+    return response
+
+
+def throttle(scope, methods=("POST",)):
+    """
+    Decorator for plain Django views.
+    Only requests whose method is in `methods` consume tokens.
+    Put it below @login_required so buckets are keyed by user.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method in methods:
+                wait = consume(scope, request_ident(request))
+                if wait:
+                    return throttled_response(wait)
+            return view_func(request, *args, **kwargs)
+        return _wrapped
+    return decorator
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by the same buckets.
+    Subclasses set `scope` or override get_scope() to pick one per request.
+    """
+
+    scope = None
+
+    def get_scope(self, request, view):
+        return self.scope
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        self._wait = consume(scope, request_ident(request)) if scope else 0
+        return not self._wait
+
+    def wait(self):
+        return self._wait
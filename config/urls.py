@@ -1,24 +1,41 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.views.generic import TemplateView
 from django.contrib.auth import views as auth_views
 from django.conf import settings
-from django.conf.urls.static import static
 
 from accounts import views as a
+from accounts.api_views import ObtainTokenView, RefreshTokenView
+from config.db_pool import pool_stats_view
+from config.metrics import metrics_view
+from config.storage import serve_media
 from restaurants.views import (
     PublicRestaurantListView,
     PublicRestaurantDetailView,
     owner_restaurant_create,
     owner_restaurant_edit,
+    owner_reservations_export,
     rate_restaurant,
+    restaurants_export,
 )
 
+if settings.ASYNC_PUBLIC_VIEWS:
+    # Served by config.asgi: async ORM versions of the public pages
+    from restaurants.async_views import restaurant_browse as browse_view, restaurant_detail as detail_view
+else:
+    browse_view = PublicRestaurantListView.as_view()
+    detail_view = PublicRestaurantDetailView.as_view()
+
 urlpatterns = [
+    # ---------- Monitoring ----------
+    path("metrics", metrics_view, name="metrics"),
+
     # ---------- Home ----------
     path("", TemplateView.as_view(template_name="home.html"), name="home"),
 
     # ---------- Admin ----------
+    path("admin/exports/restaurants/", restaurants_export, name="restaurants_export"),
+    path("admin/db-pool/", pool_stats_view, name="db_pool_stats"),
     path("admin/", admin.site.urls),
 
     # ---------- Auth (custom views) ----------
@@ -59,6 +76,7 @@ urlpatterns = [
 
     # ---------- Invitations ----------
     path("auth/invitations/create/", a.create_invitation_view, name="create_invitation"),
+    path("auth/invitations/bulk/", a.bulk_invite_view, name="bulk_invitations"),
     path("accept-invite/", a.accept_invite_view, name="accept_invite"),
 
     # ---------- Dashboards ----------
@@ -73,6 +91,7 @@ urlpatterns = [
     path("dashboard/staff/", a.staff_dashboard, name="staff_dashboard"),
     path("owner/reservations/<int:pk>/confirm/", a.owner_confirm_reservation, name="owner_confirm_reservation"),
     path("owner/reservations/<int:pk>/decline/", a.owner_decline_reservation, name="owner_decline_reservation"),
+    path("owner/reservations/export/", owner_reservations_export, name="owner_reservations_export"),
 
 
     # ---------- Built-in Django auth routes ----------
@@ -80,15 +99,19 @@ urlpatterns = [
 
     # ---------- Restaurants ----------
     # Public browse + detail (guest pages)
-    path("restaurants/", PublicRestaurantListView.as_view(), name="restaurant_browse"),
-    path("restaurants/<int:pk>/", PublicRestaurantDetailView.as_view(), name="restaurant_detail"),
+    path("restaurants/", browse_view, name="restaurant_browse"),
+    path("restaurants/<int:pk>/", detail_view, name="restaurant_detail"),
 
     # Owners manage their restaurant
     path("owner/restaurant/new/", owner_restaurant_create, name="owner_restaurant_create"),
     path("owner/restaurant/edit/", owner_restaurant_edit, name="owner_restaurant_edit"),
 
     # API 
+    path("api/token/", ObtainTokenView.as_view(), name="api_token"),
+    path("api/token/refresh/", RefreshTokenView.as_view(), name="api_token_refresh"),
     path("api/", include("restaurants.api_urls")),
 ]
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"), serve_media),
+    ]
\ No newline at end of file
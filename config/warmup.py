@@ -0,0 +1,68 @@
+"""
+Warm a freshly loaded app before it takes traffic (config/gunicorn.conf.py).
+
+- Imports every view module and compiles every URL pattern regex, by walking
+  the root resolver and populating its reverse lookups.
+- Compiles every template found by the configured engines through their
+  cached loader, so the first render of a page doesn't parse it (and its
+  parents and includes) from disk.
+
+Nothing here touches the database. Under preload_app this runs once in the
+gunicorn master and the workers inherit the result on fork.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.template import TemplateSyntaxError, engines
+from django.urls import URLResolver, get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def _compile_patterns(resolver):
+    count = 0
+    for pattern in resolver.url_patterns:  # imports the urlconf (and its views)
+        pattern.pattern.regex  # compiled lazily on first access
+        count += 1
+        if isinstance(pattern, URLResolver):
+            count += _compile_patterns(pattern)
+    return count
+
+
+def warm_urls():
+    resolver = get_resolver()
+    count = _compile_patterns(resolver)
+    resolver.reverse_dict  # builds the reverse() tables
+    return count
+
+
+def _template_names(directory):
+    return sorted(
+        path.relative_to(directory).as_posix()
+        for path in Path(directory).rglob("*")
+        if path.is_file() and path.suffix in (".html", ".txt", ".xml")
+    )
+
+
+def warm_templates():
+    count = 0
+    for backend in engines.all():
+        for directory in backend.template_dirs:
+            for name in _template_names(directory):
+                try:
+                    backend.get_template(name)
+                except TemplateSyntaxError as exc:
+                    # e.g. a third-party template for an app that isn't installed
+                    logger.debug("Not warming template %s: %s", name, exc)
+                    continue
+                count += 1
+    return count
+
+
+def warm_up():
+    """Returns (URL patterns, templates, seconds taken)."""
+    start = time.perf_counter()
+    patterns = warm_urls()
+    templates = warm_templates()
+    return patterns, templates, time.perf_counter() - start
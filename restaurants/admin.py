@@ -1,13 +1,33 @@
 from django.contrib import admin
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
-from .models import Reservation, Restaurant
+from .images import refresh_photo_derivatives
+from .models import DailyCovers, Reservation, Restaurant
 
 
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
-    list_display = ("name", "cuisine", "capacity", "rating", "owner")
+    list_display = ("name", "cuisine", "capacity", "rating", "owner", "pending_count", "covers_today", "booking_count")
+    readonly_fields = ("pending_count", "booking_count")
     search_fields = ("name", "cuisine", "address")
 
+    def get_queryset(self, request):
+        today_covers = DailyCovers.objects.filter(restaurant=OuterRef("pk"), date=timezone.localdate())
+        return super().get_queryset(request).annotate(
+            covers_today=Coalesce(Subquery(today_covers.values("confirmed_covers")[:1]), 0)
+        )
+
+    @admin.display(description="Covers today", ordering="covers_today")
+    def covers_today(self, obj):
+        return obj.covers_today
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if "photo" in form.changed_data:
+            refresh_photo_derivatives(obj)
+
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
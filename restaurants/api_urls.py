@@ -1,4 +1,5 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 from .views import RestaurantViewSet  # add more ViewSets here if you have them
 
@@ -9,3 +10,12 @@ router.register(r"restaurants", RestaurantViewSet, basename="restaurant")
 urlpatterns = [
     path("", include(router.urls)),
 ]
+
+if settings.ASYNC_PUBLIC_VIEWS:
+    # Under ASGI the async views answer reads and pass writes to the viewset
+    from . import async_views
+
+    urlpatterns = [
+        path("restaurants/", async_views.restaurant_api_list, name="restaurant-list"),
+        re_path(r"^restaurants/(?P<pk>[^/.]+)/$", async_views.restaurant_api_detail, name="restaurant-detail"),
+    ] + urlpatterns
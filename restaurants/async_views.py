@@ -0,0 +1,205 @@
+"""
+Async versions of the public read views, routed instead of the sync ones when
+the project is served through config.asgi (settings.ASYNC_PUBLIC_VIEWS).
+
+- Same URLs, names, templates, page-cache keys and response bytes as the
+  views in restaurants/views.py; queries go through the async ORM, so a slow
+  client or a slow query parks a coroutine instead of a whole worker.
+- Browse/detail keep the anonymous page cache (aget_or_build) and, like the
+  sync views, read from the primary because what they build gets cached.
+- API list/retrieve keep DRF's search/ordering filters, content negotiation
+  and throttle buckets. Anything that needs the full DRF stack (writes, the
+  browsable API, Basic auth, a bad token, 404/406/429 bodies) is handed to
+  RestaurantViewSet unchanged.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions
+from rest_framework.authentication import get_authorization_header
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+
+from accounts.tokens import read_access_token
+from config.db_routing import replica_reads
+from config.throttling import _ident_helper, consume
+
+from .cache import aget_or_build, attach_card_versions, viewer_role
+from .models import Restaurant, RestaurantRating
+from .serializers import restaurant_rows
+from .views import (
+    PublicRestaurantListView,
+    RestaurantViewSet,
+    browse_cache_key,
+    browse_queryset,
+    detail_cache_key,
+)
+
+
+async def _resolve_user(request):
+    # Resolve the lazy user up front so templates and context processors
+    # never trigger a synchronous session/user query
+    request.user = await request.auser()
+    return request.user
+
+
+def _cacheable(response):
+    return response.status_code == 200
+
+
+# ---------- HTML ----------
+@require_safe
+async def restaurant_browse(request):
+    user = await _resolve_user(request)
+    if user.is_authenticated:
+        return await _browse(request, user)
+    key = await sync_to_async(browse_cache_key)(request)
+    return await aget_or_build(key, lambda: _browse(request, user), cacheable=_cacheable)
+
+
+def _page_number(request, paginator):
+    page = request.GET.get("page") or 1
+    if page == "last":
+        return paginator.num_pages
+    try:
+        return int(page)
+    except ValueError:
+        raise Http404("Page is not “last”, nor can it be converted to an int.")
+
+
+async def _browse(request, user):
+    queryset = browse_queryset(request)
+    per_page = PublicRestaurantListView.paginate_by
+    # Paginator over a range: page maths without a sync COUNT
+    paginator = Paginator(range(await queryset.acount()), per_page)
+    try:
+        page = paginator.page(_page_number(request, paginator))
+    except InvalidPage as exc:
+        raise Http404(f"Invalid page: {exc}")
+    offset = (page.number - 1) * per_page
+    restaurants = [restaurant async for restaurant in queryset[offset:offset + per_page]]
+    await sync_to_async(attach_card_versions)(restaurants)
+    page.object_list = restaurants
+    context = {
+        "paginator": paginator,
+        "page_obj": page,
+        "is_paginated": page.has_other_pages(),
+        "object_list": restaurants,
+        "restaurants": restaurants,
+        "q": request.GET.get("q", "").strip(),
+        "cuisine": request.GET.get("cuisine", "").strip(),
+        "viewer_role": viewer_role(user),
+    }
+    return await sync_to_async(render)(request, "restaurants/browse.html", context)
+
+
+@require_safe
+async def restaurant_detail(request, pk):
+    user = await _resolve_user(request)
+    if user.is_authenticated:
+        return await _detail(request, pk, user)
+    key = await sync_to_async(detail_cache_key)(pk)
+    return await aget_or_build(key, lambda: _detail(request, pk, user), cacheable=_cacheable)
+
+
+async def _detail(request, pk, user):
+    try:
+        restaurant = await Restaurant.objects.aget(pk=pk)
+    except Restaurant.DoesNotExist:
+        raise Http404("No restaurant found matching the query")
+    user_rating = None
+    if user.is_authenticated:
+        user_rating = await RestaurantRating.objects.filter(restaurant=restaurant, user=user).afirst()
+    context = {"object": restaurant, "restaurant": restaurant, "user_rating": user_rating}
+    return await sync_to_async(render)(request, "restaurants/detail.html", context)
+
+
+# ---------- API ----------
+# Same method -> action maps as the router, whose views get everything handed over
+LIST_ACTIONS = {"get": "list", "post": "create"}
+DETAIL_ACTIONS = {"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"}
+_viewset_list = RestaurantViewSet.as_view(LIST_ACTIONS)
+_viewset_detail = RestaurantViewSet.as_view(DETAIL_ACTIONS)
+
+
+class _HandOver(Exception):
+    """Let RestaurantViewSet answer this request."""
+
+
+async def _api_ident(request):
+    """Throttle ident as DRF would compute it, without a password check."""
+    auth = get_authorization_header(request).split()
+    if auth:
+        if auth[0].lower() != b"bearer" or len(auth) != 2:
+            raise _HandOver  # Basic auth / malformed header: DRF authenticates it
+        claims = read_access_token(auth[1].decode("latin-1"))
+        if claims is None:
+            raise _HandOver  # DRF answers 401
+        return f"user:{claims['uid']}"
+    user = await _resolve_user(request)
+    if user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{_ident_helper.get_ident(request)}"
+
+
+async def _api_read(request, actions, pk=None):
+    action = actions["get"]
+    view = RestaurantViewSet(action=action, args=(), kwargs={"pk": pk} if pk else {}, format_kwarg=None)
+    for method, name in {"head": "list" if pk is None else "retrieve", **actions}.items():
+        setattr(view, method, getattr(view, name))  # what as_view() binds; drives the Allow header
+    drf_request = view.request = Request(request)
+    try:
+        renderer, media_type = view.perform_content_negotiation(drf_request)
+    except exceptions.NotAcceptable:
+        raise _HandOver
+    if isinstance(renderer, BrowsableAPIRenderer):
+        raise _HandOver
+
+    scope = "api_search" if drf_request.query_params.get("search") else "api_read"
+    if await sync_to_async(consume, thread_sensitive=False)(scope, await _api_ident(request)):
+        raise _HandOver  # throttled: DRF builds the 429 (the bucket stays empty)
+
+    queryset = restaurant_rows.values(view.filter_queryset(view.get_queryset()))
+    if action == "list":
+        data = restaurant_rows.rows([row async for row in queryset], request)
+    else:
+        try:
+            row = await queryset.filter(pk=pk).afirst()
+        except (TypeError, ValueError):
+            raise _HandOver  # e.g. a non-numeric pk: DRF's get_object() answers 404
+        if row is None:
+            raise _HandOver
+        data = restaurant_rows.rows([row], request)[0]
+
+    body = renderer.render(data, media_type, {"request": drf_request, "view": view})
+    charset = renderer.charset
+    response = HttpResponse(body, content_type=f"{media_type}; charset={charset}" if charset else media_type)
+    response["Allow"] = ", ".join(view.allowed_methods)
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+@csrf_exempt  # as DRF views are; SessionAuthentication enforces CSRF on writes
+@replica_reads
+async def restaurant_api_list(request):
+    if request.method in ("GET", "HEAD"):
+        try:
+            return await _api_read(request, LIST_ACTIONS)
+        except _HandOver:
+            pass
+    return await sync_to_async(_viewset_list)(request)
+
+
+@csrf_exempt
+@replica_reads
+async def restaurant_api_detail(request, pk):
+    if request.method in ("GET", "HEAD"):
+        try:
+            return await _api_read(request, DETAIL_ACTIONS, pk)
+        except _HandOver:
+            pass
+    return await sync_to_async(_viewset_detail)(request, pk=pk)
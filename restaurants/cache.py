@@ -0,0 +1,201 @@
+"""
+Versioned cache for public restaurant pages and card fragments.
+
+- Every restaurant has a version number in the cache, and so does the
+  catalogue as a whole (what the browse list shows). restaurants/signals.py
+  bumps them when a Restaurant or RestaurantRating changes, so outdated
+  entries are simply never looked up again and age out on their own.
+- A missing version is initialised from the clock rather than 1, so an
+  evicted counter can never come back and match an old entry.
+- get_or_build() lets exactly one request regenerate a missing key while the
+  others wait for it (stampede protection).
+- Versions only invalidate what shares the cache, so outside DEBUG settings
+  require PAGE_CACHE_ALIAS to be a shared (Redis) cache, not per-process locmem.
+"""
+import asyncio
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+
+from config.metrics import record_cache
+
+LOCK_TIMEOUT = 10  # seconds a regeneration lock may be held
+LOCK_POLL = 0.05
+
+
+def page_cache():
+    return caches[settings.PAGE_CACHE_ALIAS]
+
+
+# ---------- Versions ----------
+def _version_key(pk):
+    return f"restaurant:v:{pk}"
+
+
+CATALOGUE_VERSION_KEY = "restaurant:v:catalogue"
+
+
+def _get_version(key):
+    cache = page_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def _bump(key):
+    cache = page_cache()
+    try:
+        cache.incr(key)
+    except ValueError:  # not set yet (or evicted)
+        cache.set(key, time.time_ns(), None)
+
+
+def restaurant_version(pk):
+    return _get_version(_version_key(pk))
+
+
+def restaurant_versions(pks):
+    """Versions for many restaurants in one round trip: {pk: version}."""
+    cache = page_cache()
+    keys = {_version_key(pk): pk for pk in pks}
+    found = cache.get_many(keys)
+    versions = {keys[k]: v for k, v in found.items()}
+    missing = [pk for pk in pks if pk not in versions]
+    if missing:
+        now = time.time_ns()
+        cache.set_many({_version_key(pk): now for pk in missing}, None)
+        versions.update({pk: now for pk in missing})
+    return versions
+
+
+def attach_card_versions(restaurants):
+    """
+    Set .card_version on each restaurant (one get_many for the whole list) so
+    templates can key {% cache %} fragments on it.
+    """
+    versions = restaurant_versions([r.pk for r in restaurants])
+    for r in restaurants:
+        r.card_version = versions[r.pk]
+    return restaurants
+
+
+def viewer_role(user):
+    """Role component of fragment keys; anonymous visitors share one variant."""
+    return getattr(user, "role", "") if user.is_authenticated else "ANON"
+
+
+def catalogue_version():
+    return _get_version(CATALOGUE_VERSION_KEY)
+
+
+def bump_restaurant(pk):
+    """Invalidate everything that renders restaurant `pk`."""
+    _bump(_version_key(pk))
+    _bump(CATALOGUE_VERSION_KEY)
+
+
+# ---------- Stampede-safe get ----------
+def get_or_build(key, build, timeout=None, cacheable=lambda value: value is not None):
+    """
+    Return the cached value for `key`, or build it.
+    Only the request that wins the lock calls build() and stores the result;
+    concurrent requests poll for up to LOCK_TIMEOUT before building themselves.
+    """
+    cache = page_cache()
+    value = cache.get(key)
+    record_cache("page", value is not None)
+    if value is not None:
+        return value
+
+    timeout = settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = build()
+            if cacheable(value):
+                cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.get(lock_key) is None:  # builder gave up (error / not cacheable)
+            break
+    return build()
+
+
+async def aget_or_build(key, build, timeout=None, cacheable=lambda value: value is not None):
+    """get_or_build() for async views: `build` is a coroutine function."""
+    cache = page_cache()
+    value = await cache.aget(key)
+    record_cache("page", value is not None)
+    if value is not None:
+        return value
+
+    timeout = settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout
+    lock_key = f"{key}:lock"
+    if await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = await build()
+            if cacheable(value):
+                await cache.aset(key, value, timeout)
+        finally:
+            await cache.adelete(lock_key)
+        return value
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+        if await cache.aget(lock_key) is None:
+            break
+    return await build()
+
+
+# ---------- View mixin ----------
+class AnonymousPageCacheMixin:
+    """
+    Serve cached, fully rendered responses to anonymous GET/HEAD requests.
+    Views implement get_page_cache_key(); logged-in users always get a fresh page.
+    """
+
+    def get_page_cache_key(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        def build():
+            response = super(AnonymousPageCacheMixin, self).dispatch(request, *args, **kwargs)
+            if hasattr(response, "render") and callable(response.render):
+                response.render()
+            return response
+
+        return get_or_build(
+            self.get_page_cache_key(),
+            build,
+            cacheable=lambda response: response.status_code == 200,
+        )
+
+
+def query_fingerprint(request, params):
+    """Stable hash of the whitelisted, stripped, non-empty GET params."""
+    items = sorted(
+        (name, request.GET.get(name, "").strip())
+        for name in params
+        if request.GET.get(name, "").strip()
+    )
+    return hashlib.md5(urlencode(items).encode(), usedforsecurity=False).hexdigest()
@@ -0,0 +1,107 @@
+"""
+Denormalised reservation counters.
+
+- Restaurant.booking_count (every reservation) and Restaurant.pending_count,
+  plus DailyCovers.confirmed_covers (sum of party_size of CONFIRMED
+  reservations per restaurant and date; "covers today" is one row lookup).
+- Reservation.save() calls apply_change() inside the same transaction as the
+  row change, with the row's previous state read under SELECT ... FOR UPDATE,
+  so concurrent transitions of one reservation can't double count; deletes go
+  through a post_delete receiver (restaurants/signals.py). Counters move with
+  F() updates, never read-modify-write.
+- QuerySet.update()/bulk_create() bypass this; `repair_reservation_counters`
+  recomputes everything with grouped queries.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+COUNTER_FIELDS = ("booking_count", "pending_count")
+
+
+def counted_state(reservation):
+    """What a reservation contributes: (restaurant_id, status, date, party_size)."""
+    return (
+        reservation.restaurant_id,
+        reservation.status,
+        reservation.reservation_date,
+        reservation.party_size,
+    )
+
+
+def apply_change(before, after, using="default"):
+    """Move the counters from `before` to `after` (either may be None)."""
+    from .models import DailyCovers, Reservation, Restaurant
+
+    if before == after:
+        return
+    restaurant_deltas = defaultdict(Counter)
+    cover_deltas = Counter()
+    for state, sign in ((before, -1), (after, 1)):
+        if state is None:
+            continue
+        restaurant_id, status, date, party_size = state
+        restaurant_deltas[restaurant_id]["booking_count"] += sign
+        if status == Reservation.Status.PENDING:
+            restaurant_deltas[restaurant_id]["pending_count"] += sign
+        if status == Reservation.Status.CONFIRMED:
+            cover_deltas[restaurant_id, date] += sign * party_size
+
+    with transaction.atomic(using=using):
+        for restaurant_id, deltas in restaurant_deltas.items():
+            updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+            if updates:
+                Restaurant.objects.using(using).filter(pk=restaurant_id).update(**updates)
+        for (restaurant_id, date), delta in cover_deltas.items():
+            if delta > 0:
+                # Only increments create the day's row (a delete cascading from the
+                # restaurant must not add rows the cascade has already collected)
+                DailyCovers.objects.using(using).get_or_create(restaurant_id=restaurant_id, date=date)
+            if delta:
+                DailyCovers.objects.using(using).filter(restaurant_id=restaurant_id, date=date).update(
+                    confirmed_covers=F("confirmed_covers") + delta
+                )
+
+
+def recompute(using="default"):
+    """
+    Rebuild every counter from Reservation. Returns the number of restaurants
+    whose booking/pending counts had drifted.
+    """
+    from .models import DailyCovers, Reservation, Restaurant
+
+    pending = Reservation.Status.PENDING
+    with transaction.atomic(using=using):
+        # Lock the counters so live updates wait for the rebuild
+        restaurants = list(Restaurant.objects.using(using).select_for_update().only("pk", *COUNTER_FIELDS))
+        totals = {
+            row["restaurant"]: row
+            for row in Reservation.objects.using(using)
+            .values("restaurant")
+            .annotate(booking_count=Count("id"), pending_count=Count("id", filter=Q(status=pending)))
+            .order_by()
+        }
+        drifted = []
+        for restaurant in restaurants:
+            row = totals.get(restaurant.pk, {})
+            expected = {field: row.get(field, 0) for field in COUNTER_FIELDS}
+            if any(getattr(restaurant, field) != value for field, value in expected.items()):
+                for field, value in expected.items():
+                    setattr(restaurant, field, value)
+                drifted.append(restaurant)
+        Restaurant.objects.using(using).bulk_update(drifted, COUNTER_FIELDS)
+
+        covers = (
+            Reservation.objects.using(using)
+            .filter(status=Reservation.Status.CONFIRMED)
+            .values("restaurant", "reservation_date")
+            .annotate(covers=Sum("party_size"))
+            .order_by()
+        )
+        DailyCovers.objects.using(using).all().delete()
+        DailyCovers.objects.using(using).bulk_create(
+            DailyCovers(restaurant_id=row["restaurant"], date=row["reservation_date"], confirmed_covers=row["covers"])
+            for row in covers
+        )
+    return len(drifted)
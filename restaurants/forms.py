@@ -2,6 +2,7 @@ import datetime
 import json
 
 from django import forms
+from django.conf import settings
 from django.utils import timezone
 
 from .models import Reservation, Restaurant
@@ -30,6 +31,8 @@ class RestaurantForm(forms.ModelForm):
         ]
 
     def __init__(self, *args, **kwargs):
+        # {field: message} for uploads the upload handler refused to read
+        self.rejected_uploads = kwargs.pop("rejected_uploads", None) or {}
         super().__init__(*args, **kwargs)
         existing = self.initial.get("opening_hours")
         if isinstance(existing, dict):
@@ -40,6 +43,23 @@ class RestaurantForm(forms.ModelForm):
             self.initial["opening_hours"] = existing
             self.fields["opening_hours"].initial = existing
 
+    def clean_photo(self):
+        photo = self.cleaned_data.get("photo")
+        # forms.ImageField leaves the header-only PIL image on the upload
+        image = getattr(photo, "image", None)
+        if image is not None and image.width * image.height > settings.PHOTO_MAX_PIXELS:
+            raise forms.ValidationError(
+                f"Image is too large ({image.width}x{image.height}); "
+                f"please upload at most {settings.PHOTO_MAX_PIXELS // 1_000_000} megapixels."
+            )
+        return photo
+
+    def clean(self):
+        cleaned = super().clean()
+        for field, message in self.rejected_uploads.items():
+            self.add_error(field if field in self.fields else None, message)
+        return cleaned
+
     def clean_opening_hours(self):
         data = (self.cleaned_data.get("opening_hours") or "").strip()
         if not data:
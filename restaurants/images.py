@@ -0,0 +1,249 @@
+"""
+Restaurant photo derivatives.
+
+Each uploaded photo is rendered once, with Pillow, into every PHOTO_VARIANTS
+size at 1x and 2x, in WebP plus a JPEG fallback. The stored names are kept on
+Restaurant.photo_derivatives, e.g.
+
+    {"card": {"width": 80, "height": 80,
+              "webp@1x": "...", "jpeg@1x": "...", "webp@2x": "...", "jpeg@2x": "..."}}
+
+Alongside them, render_placeholder() computes a ~20px JPEG preview (stored as
+a data: URI in Restaurant.photo_lqip) and the dominant colour
+(Restaurant.photo_color), so cards paint something before the photo arrives.
+
+Templates use {% restaurant_photo %} (templatetags/restaurant_tags.py), which
+emits <picture> with srcset/sizes and loading="lazy".
+
+Owner uploads are processed off the request: the view moves the streamed
+temp file into PHOTO_STAGING_DIR and queue_photo_upload() hands it to a
+small per-process thread pool that decodes it, fixes orientation, strips
+EXIF, stores the clean original and renders the derivatives. The row records
+the staged file and when it was queued; a job lost with its worker is retried
+or reset (with photo_error for the owner) by `manage.py sweep_photo_uploads`,
+which also deletes staged files nothing is waiting for.
+"""
+import base64
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import bump_restaurant
+
+logger = logging.getLogger(__name__)
+
+# variant -> (width, height) at 1x; the 2x copy is skipped if the source is too small
+PHOTO_VARIANTS = {
+    "card": (80, 80),      # browse / customer dashboard thumbnails
+    "hero": (960, 320),    # detail page banner
+}
+SCALES = (1, 2)
+FORMATS = (
+    ("webp", "WEBP", {"quality": 80, "method": 4}),
+    ("jpeg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+)
+DERIVED_DIR = "restaurant_photos/derived"
+LQIP_SIZE = 20  # longest side of the inline preview, in px
+PHOTO_FAILED = "We couldn't process your last photo. Please upload a JPEG, PNG or WebP image again."
+PHOTO_INTERRUPTED = "Processing of your last photo was interrupted. Please upload it again."
+
+
+def render_derivatives(image, stem, storage):
+    """Render and store every variant of an already-decoded, upright RGB image."""
+    derivatives = {}
+    for variant, (width, height) in PHOTO_VARIANTS.items():
+        entry = {"width": width, "height": height}
+        for scale in SCALES:
+            size = (width * scale, height * scale)
+            if scale > 1 and (image.width < size[0] or image.height < size[1]):
+                continue
+            resized = ImageOps.fit(image, size, Image.LANCZOS)
+            for ext, fmt, options in FORMATS:
+                buf = BytesIO()
+                resized.save(buf, fmt, **options)
+                name = f"{DERIVED_DIR}/{stem}-{variant}-{scale}x.{ext}"
+                entry[f"{ext}@{scale}x"] = storage.save(name, ContentFile(buf.getvalue()))
+        derivatives[variant] = entry
+    return derivatives
+
+
+def render_placeholder(image):
+    """Return (data_uri, "#rrggbb") for a decoded RGB image."""
+    small = image.copy()
+    small.thumbnail((LQIP_SIZE, LQIP_SIZE), Image.BILINEAR)
+    buf = BytesIO()
+    small.save(buf, "JPEG", quality=40)
+    data_uri = "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+    # Most common colour of a 4-colour quantisation, not the (muddy) average
+    palette = small.quantize(colors=4)
+    _, index = max(palette.getcolors())
+    r, g, b = palette.getpalette()[index * 3:index * 3 + 3]
+    return data_uri, f"#{r:02x}{g:02x}{b:02x}"
+
+
+def open_upright(fileobj):
+    """Decode an image, apply its EXIF orientation and return it as RGB."""
+    image = Image.open(fileobj)
+    image.load()
+    image = ImageOps.exif_transpose(image)
+    return image.convert("RGB")
+
+
+def derivative_names(derivatives):
+    """Storage names referenced by a photo_derivatives value."""
+    for entry in (derivatives or {}).values():
+        for key, name in entry.items():
+            if "@" in key:
+                yield name
+
+
+def refresh_photo_derivatives(restaurant):
+    """
+    (Re)build derivatives and placeholder for restaurant.photo, or drop them
+    if the photo was cleared. Saves only those columns. Replaced files are
+    left for gc_media: with content-addressed storage they may be shared.
+    """
+    storage = restaurant.photo.storage
+    if restaurant.photo:
+        with restaurant.photo.open("rb") as fh:
+            image = open_upright(fh)
+        stem = PurePosixPath(restaurant.photo.name).stem
+        restaurant.photo_derivatives = render_derivatives(image, stem, storage)
+        restaurant.photo_lqip, restaurant.photo_color = render_placeholder(image)
+    else:
+        restaurant.photo_derivatives = {}
+        restaurant.photo_lqip = restaurant.photo_color = ""
+    restaurant.save(update_fields=["photo_derivatives", "photo_lqip", "photo_color"])
+
+
+# ---------- Background processing ----------
+_executor = None
+
+
+def _pool():
+    # Created lazily so each gunicorn worker (post-fork) gets its own threads
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PHOTO_WORKERS, thread_name_prefix="photo"
+        )
+    return _executor
+
+
+def stage_upload(upload):
+    """Move an uploaded file into PHOTO_STAGING_DIR and return the new path."""
+    os.makedirs(settings.PHOTO_STAGING_DIR, exist_ok=True)
+    path = os.path.join(settings.PHOTO_STAGING_DIR, uuid.uuid4().hex)
+    if hasattr(upload, "temporary_file_path"):
+        shutil.move(upload.temporary_file_path(), path)
+    else:
+        with open(path, "wb") as out:
+            for chunk in upload.chunks():
+                out.write(chunk)
+    return path
+
+
+def queue_photo_upload(restaurant, upload, previous_name=None):
+    """
+    Take a freshly uploaded photo out of the request/response cycle.
+    Saves the restaurant with its previous photo (if any) and
+    photo_processing=True, then schedules processing once the surrounding
+    transaction commits.
+    """
+    staged = stage_upload(upload)
+    restaurant.photo = previous_name or None
+    restaurant.photo_processing = True
+    restaurant.photo_staged = os.path.basename(staged)
+    restaurant.photo_queued_at = timezone.now()
+    restaurant.photo_error = ""
+    restaurant.save()
+    transaction.on_commit(
+        lambda: _pool().submit(process_staged_photo, restaurant.pk, staged, upload.name)
+    )
+
+
+def finish_photo_upload(pk, staged_name, **fields):
+    """Clear the upload state, unless a newer upload has replaced this one."""
+    from .models import Restaurant
+
+    updated = Restaurant.objects.filter(pk=pk, photo_staged=staged_name).update(
+        photo_processing=False, photo_staged="", photo_queued_at=None, **fields
+    )
+    if updated:
+        # update() sends no post_save, so invalidate the cached pages here
+        transaction.on_commit(lambda: bump_restaurant(pk))
+    return updated
+
+
+def process_staged_photo(pk, staged_path, original_name):
+    from .models import Restaurant
+
+    staged_name = os.path.basename(staged_path)
+    close_old_connections()
+    try:
+        restaurant = Restaurant.objects.filter(pk=pk, photo_staged=staged_name).first()
+        if restaurant is None:
+            return  # superseded by a newer upload, or reset by the sweep
+        with open(staged_path, "rb") as fh:
+            image = open_upright(fh)
+        # Re-encoding drops EXIF (GPS, camera serials) along with the orientation tag
+        buf = BytesIO()
+        image.save(buf, "JPEG", quality=88, optimize=True, progressive=True)
+
+        stem = PurePosixPath(original_name).stem or "photo"
+        restaurant.photo.save(f"{stem}.jpg", ContentFile(buf.getvalue()), save=False)
+        storage = restaurant.photo.storage
+        restaurant.photo_derivatives = render_derivatives(image, PurePosixPath(restaurant.photo.name).stem, storage)
+        restaurant.photo_lqip, restaurant.photo_color = render_placeholder(image)
+        restaurant.save(update_fields=["photo", "photo_derivatives", "photo_lqip", "photo_color"])
+        finish_photo_upload(pk, staged_name, photo_error="")
+    except Exception:
+        logger.exception("Processing photo for restaurant %s failed", pk)
+        finish_photo_upload(pk, staged_name, photo_error=PHOTO_FAILED)
+    finally:
+        try:
+            os.remove(staged_path)
+        except FileNotFoundError:
+            pass
+        close_old_connections()
+
+
+class PhotoVariant:
+    """Read-only view of one variant, as returned by Restaurant.card_photo etc."""
+
+    def __init__(self, storage, entry):
+        self.storage = storage
+        self.entry = entry
+        self.width = entry["width"]
+        self.height = entry["height"]
+
+    def _srcset(self, ext):
+        parts = []
+        for scale in SCALES:
+            name = self.entry.get(f"{ext}@{scale}x")
+            if name:
+                parts.append(f"{self.storage.url(name)} {self.width * scale}w")
+        return ", ".join(parts)
+
+    @property
+    def src(self):
+        return self.storage.url(self.entry["jpeg@1x"])
+
+    @property
+    def webp_srcset(self):
+        return self._srcset("webp")
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset("jpeg")
@@ -0,0 +1,86 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from restaurants.models import Restaurant
+from restaurants.renderers import FastJSONRenderer
+from restaurants.serializers import RestaurantSerializer, restaurant_rows
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark RestaurantSerializer + JSONRenderer against the fast "
+        "values()-based read path, and check both produce identical bytes. "
+        "Fixture rows are created inside a transaction and rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["rows"], options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, n_rows, repeat):
+        owner = User.objects.create_user(email="bench-owner@bookify.local", password=None)
+        Restaurant.objects.bulk_create(
+            Restaurant(
+                owner=owner,
+                name=f"Bench {i} — Café",
+                address=f"{i} Hamra Street, Beirut",
+                cuisine="Lebanese",
+                capacity=40 + i % 20,
+                description="Mezze, grills and fresh bread.",
+                price_level=1 + i % 4,
+                opening_hours={"Mon": {"open": "09:00", "close": "23:00"}},
+                photo="restaurant_photos/barbar.jpg" if i % 2 else "",
+                rating=Decimal(i % 50) / 10,
+            )
+            for i in range(n_rows)
+        )
+        request = APIRequestFactory().get("/api/restaurants/")
+        queryset = Restaurant.objects.order_by("-rating")
+
+        def drf_path():
+            data = RestaurantSerializer(
+                queryset.all(), many=True, context={"request": request}
+            ).data
+            return JSONRenderer().render(data)
+
+        def fast_path():
+            data = restaurant_rows.rows(restaurant_rows.values(queryset.all()), request)
+            return FastJSONRenderer().render(data)
+
+        if drf_path() != fast_path():
+            raise CommandError("Fast path output differs from RestaurantSerializer output.")
+
+        drf = self._time(drf_path, repeat)
+        fast = self._time(fast_path, repeat)
+        self.stdout.write(f"rows={n_rows} repeat={repeat}")
+        self.stdout.write(f"ModelSerializer + JSONRenderer : {drf * 1000:8.2f} ms/request")
+        self.stdout.write(f"RowPlan + FastJSONRenderer     : {fast * 1000:8.2f} ms/request")
+        self.stdout.write(self.style.SUCCESS(f"speedup x{drf / fast:.1f} (byte-identical output)"))
+
+    @staticmethod
+    def _time(fn, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
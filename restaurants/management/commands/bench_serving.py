@@ -0,0 +1,170 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MODES = ("wsgi", "asgi")
+
+
+def _children(pid):
+    try:
+        tasks = Path(f"/proc/{pid}/task").iterdir()
+        found = []
+        for task in tasks:
+            found += [int(c) for c in (task / "children").read_text().split()]
+        return found
+    except OSError:
+        return []
+
+
+def _rss_mb(pid):
+    """Resident memory of `pid` and all its descendants, in MB (Linux /proc)."""
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            for line in Path(f"/proc/{current}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+        except OSError:
+            continue
+        stack += _children(current)
+    return total / 1024
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _fetch(port, request):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(request)
+        await writer.drain()
+        data = await reader.read()
+    finally:
+        writer.close()
+    return data[9:12]  # status code from "HTTP/1.1 200 ..."
+
+
+async def _load(port, path, concurrency, duration):
+    """`concurrency` connections hammering `path` for `duration` seconds."""
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode()
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            try:
+                status = await _fetch(port, request)
+            except OSError:
+                status = b""
+            if status == b"200":
+                latencies.append(time.monotonic() - start)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    latencies.sort()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent-connection throughput of the WSGI (sync workers) and "
+        "ASGI (uvicorn workers, async public views) servers at the same memory "
+        "budget. Runs both through config/gunicorn.conf.py against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", action="append", help="URL to load (repeatable). Default: API list + browse page.")
+        parser.add_argument("--memory-mb", type=int, default=512, help="RSS budget per server (master + workers).")
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per path.")
+
+    def handle(self, *args, **options):
+        paths = options["path"] or ["/api/restaurants/", "/restaurants/"]
+        results = []
+        for mode in MODES:
+            workers, per_worker = self._workers_for(mode, options["memory_mb"])
+            self.stdout.write(f"{mode}: ~{per_worker:.0f} MB per worker -> {workers} workers")
+            with self._server(mode, workers) as (port, pid):
+                for path in paths:
+                    asyncio.run(_load(port, path, min(4, options["concurrency"]), 1))  # warm up
+                    latencies, errors = asyncio.run(
+                        _load(port, path, options["concurrency"], options["duration"])
+                    )
+                    results.append((mode, workers, path, latencies, errors, _rss_mb(pid)))
+
+        self.stdout.write(
+            f"\n{'server':6} {'workers':>7} {'path':28} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'RSS MB':>7}"
+        )
+        for mode, workers, path, latencies, errors, rss in results:
+            if not latencies:
+                raise CommandError(f"{mode} {path}: no successful responses ({errors} errors)")
+            rate = len(latencies) / options["duration"]
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            self.stdout.write(
+                f"{mode:6} {workers:>7} {path:28} {rate:>8.0f} {p50:>8.1f} {p99:>8.1f} {errors:>7} {rss:>7.0f}"
+            )
+
+    def _workers_for(self, mode, budget):
+        """Measure one worker of `mode` and fit as many as the budget allows."""
+        with self._server(mode, 1) as (port, pid):
+            asyncio.run(_load(port, "/api/restaurants/", 2, 1))
+            total = _rss_mb(pid)
+            master = _rss_mb(pid) - sum(_rss_mb(child) for child in _children(pid))
+        per_worker = total - master
+        return max(1, int((budget - master) // per_worker)), per_worker
+
+    @contextmanager
+    def _server(self, mode, workers):
+        port = _free_port()
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            env = {**os.environ, "SERVER_MODE": mode, "PROMETHEUS_MULTIPROC_DIR": metrics_dir}
+            process = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "-c", "config/gunicorn.conf.py",
+                 "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level", "warning"],
+                cwd=settings.BASE_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                self._wait_for(process, port, mode)
+                yield port, process.pid
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    @staticmethod
+    def _wait_for(process, port, mode):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                break
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            except OSError:
+                time.sleep(0.2)
+                continue
+            time.sleep(1)  # let every worker finish booting
+            return
+        raise CommandError(f"{mode} server did not start")
@@ -0,0 +1,75 @@
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from restaurants.images import derivative_names
+from restaurants.models import Restaurant
+
+
+def referenced_names():
+    """Every media name a row still points at (FileFields + photo derivatives)."""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField):
+                names.update(
+                    model._default_manager.exclude(**{field.name: ""})
+                    .exclude(**{f"{field.name}__isnull": True})
+                    .values_list(field.name, flat=True)
+                    .iterator()
+                )
+    for derivatives in Restaurant.objects.values_list("photo_derivatives", flat=True).iterator():
+        names.update(derivative_names(derivatives))
+    return names
+
+
+def walk(storage, path=""):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield f"{path}/{name}" if path else name
+    for directory in directories:
+        yield from walk(storage, f"{path}/{directory}" if path else directory)
+
+
+class Command(BaseCommand):
+    help = "Delete media files no longer referenced by any row (content-addressed blobs are shared, so nothing else does)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace", type=int, default=settings.MEDIA_GC_GRACE_SECONDS,
+            help="Keep unreferenced files younger than this many seconds (uploads in flight).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only list what would be deleted.")
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        # Snapshot references first: anything stored after this is younger than
+        # the grace period (a re-used blob's mtime is refreshed on save)
+        keep = referenced_names()
+        cutoff = time.time() - options["grace"]
+        candidates = []
+        kept = 0
+        for name in walk(storage):
+            if name in keep:
+                kept += 1
+            elif storage.get_modified_time(name).timestamp() <= cutoff:
+                candidates.append(name)
+        # Rows saved during the walk may have picked up an old blob again
+        keep = referenced_names()
+        deleted = 0
+        for name in candidates:
+            if name in keep:
+                kept += 1
+                continue
+            if storage.get_modified_time(name).timestamp() > cutoff:  # re-used since the walk
+                continue
+            self.stdout.write(name)
+            if not options["dry_run"]:
+                storage.delete(name)
+            deleted += 1
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} unreferenced files ({kept} in use)."))
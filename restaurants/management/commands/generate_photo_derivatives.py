@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.images import refresh_photo_derivatives
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = "Backfill thumbnail/hero derivatives (WebP + JPEG, 1x/2x) and placeholders for restaurant photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Regenerate even if derivatives already exist.",
+        )
+        parser.add_argument("ids", nargs="*", type=int, help="Only these restaurant ids.")
+
+    def handle(self, *args, **options):
+        qs = Restaurant.objects.exclude(photo="").exclude(photo__isnull=True).order_by("id")
+        if options["ids"]:
+            qs = qs.filter(id__in=options["ids"])
+        done = failed = 0
+        for restaurant in qs.iterator():
+            if restaurant.photo_derivatives and restaurant.photo_lqip and not options["force"]:
+                continue
+            try:
+                refresh_photo_derivatives(restaurant)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f"{restaurant.pk} {restaurant.photo.name}: {exc}")
+                continue
+            done += 1
+            self.stdout.write(f"{restaurant.pk} {restaurant.name}")
+        self.stdout.write(self.style.SUCCESS(f"Generated derivatives for {done} restaurants ({failed} failed)."))
@@ -0,0 +1,53 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from restaurants.images import PHOTO_INTERRUPTED, finish_photo_upload, process_staged_photo
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Recover photo uploads whose background job was lost (worker restart, "
+        "rollout, kill): process them now if their staged file is still here, "
+        "otherwise reset the row and tell the owner to upload again. Also "
+        "deletes staged files no restaurant is waiting for."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale", type=int, default=settings.PHOTO_STALE_SECONDS,
+            help="Seconds after which a queued upload counts as lost.",
+        )
+
+    def handle(self, *args, **options):
+        staging = settings.PHOTO_STAGING_DIR
+        cutoff = timezone.now() - timedelta(seconds=options["stale"])
+        retried = reset = 0
+        stuck = Restaurant.objects.filter(photo_processing=True).exclude(photo_queued_at__gt=cutoff)
+        for pk, staged_name in stuck.values_list("pk", "photo_staged"):
+            path = os.path.join(staging, staged_name)
+            if staged_name and os.path.isfile(path):
+                process_staged_photo(pk, path, "photo.jpg")
+                retried += 1
+            else:
+                # Staged on another pod's disk, or already gone
+                reset += finish_photo_upload(pk, staged_name, photo_error=PHOTO_INTERRUPTED)
+
+        waiting = set(
+            Restaurant.objects.filter(photo_processing=True).values_list("photo_staged", flat=True)
+        )
+        orphans = 0
+        if os.path.isdir(staging):
+            for entry in os.scandir(staging):
+                if entry.name in waiting or entry.stat().st_mtime > time.time() - options["stale"]:
+                    continue
+                os.remove(entry.path)
+                orphans += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Retried {retried}, reset {reset} stuck uploads; deleted {orphans} orphaned staged files."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0009_restaurantrating"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="photo_derivatives",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0010_restaurant_photo_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="photo_processing",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
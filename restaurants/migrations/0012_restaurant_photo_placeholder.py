@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0011_restaurant_photo_processing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="photo_color",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=7
+            ),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="photo_lqip",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+    ]
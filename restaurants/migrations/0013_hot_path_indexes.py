@@ -0,0 +1,80 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Django's icontains compiles to UPPER(col) LIKE UPPER('%term%') on Postgres;
+# trigram GIN indexes over the same expression let browse/dashboard search
+# avoid a sequential scan. Other backends keep the plain btree indexes only.
+TRIGRAM_COLUMNS = ("name", "cuisine", "address")
+
+
+def add_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS restaurant_{column}_trgm_idx "
+            f"ON restaurants_restaurant USING gin (UPPER({column}) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS restaurant_{column}_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0012_restaurant_photo_placeholder"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["customer", "reservation_date", "reservation_time"],
+                name="resv_customer_when_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["restaurant", "status", "reservation_date"],
+                name="resv_rest_status_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["restaurant", "reservation_date", "reservation_time"],
+                name="resv_rest_when_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                condition=models.Q(("status__in", ["PENDING", "CONFIRMED"])),
+                fields=["restaurant", "reservation_date", "reservation_time"],
+                name="resv_open_when_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(fields=["name"], name="restaurant_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(fields=["-rating"], name="restaurant_rating_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(fields=["cuisine"], name="restaurant_cuisine_idx"),
+        ),
+        migrations.RunPython(add_trigram_indexes, drop_trigram_indexes),
+    ]
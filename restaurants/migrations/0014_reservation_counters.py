@@ -0,0 +1,84 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_counters(apps, schema_editor):
+    Restaurant = apps.get_model("restaurants", "Restaurant")
+    Reservation = apps.get_model("restaurants", "Reservation")
+    DailyCovers = apps.get_model("restaurants", "DailyCovers")
+    db = schema_editor.connection.alias
+    totals = (
+        Reservation.objects.using(db)
+        .values("restaurant")
+        .annotate(booking_count=Count("id"), pending_count=Count("id", filter=Q(status="PENDING")))
+        .order_by()
+    )
+    for row in totals:
+        Restaurant.objects.using(db).filter(pk=row["restaurant"]).update(
+            booking_count=row["booking_count"], pending_count=row["pending_count"]
+        )
+    covers = (
+        Reservation.objects.using(db)
+        .filter(status="CONFIRMED")
+        .values("restaurant", "reservation_date")
+        .annotate(covers=Sum("party_size"))
+        .order_by()
+    )
+    DailyCovers.objects.using(db).bulk_create(
+        DailyCovers(restaurant_id=row["restaurant"], date=row["reservation_date"], confirmed_covers=row["covers"])
+        for row in covers
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0013_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="booking_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="pending_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name="DailyCovers",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("confirmed_covers", models.IntegerField(default=0)),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_covers",
+                        to="restaurants.restaurant",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="dailycovers",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "date"), name="daily_covers_restaurant_date_uniq"
+            ),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurants", "0014_reservation_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="photo_error",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=200
+            ),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="photo_queued_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="photo_staged",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=64
+            ),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -33,6 +33,19 @@ class Restaurant(models.Model):
         blank=True,
         null=True
     )
+    # Resized WebP/JPEG copies of `photo`, see restaurants/images.py
+    photo_derivatives = models.JSONField(blank=True, default=dict, editable=False)
+    # Inline preview (data: URI, ~20px) and dominant colour shown while the photo loads
+    photo_lqip = models.TextField(blank=True, default="", editable=False)
+    photo_color = models.CharField(max_length=7, blank=True, default="", editable=False)
+    # True while a new upload is being processed in the background
+    photo_processing = models.BooleanField(default=False, editable=False)
+    # That upload's file in PHOTO_STAGING_DIR and when it was queued, so
+    # `sweep_photo_uploads` can retry or reset it if the job was lost
+    photo_staged = models.CharField(max_length=64, blank=True, default="", editable=False)
+    photo_queued_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Shown to the owner when the last upload could not be processed
+    photo_error = models.CharField(max_length=200, blank=True, default="", editable=False)
     rating = models.DecimalField(
         max_digits=3,
         decimal_places=1,
@@ -40,6 +53,9 @@ class Restaurant(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(5)],
         help_text="Average rating shown to users (0.0–5.0).",
     )
+    # Maintained by restaurants/counters.py on every reservation change
+    booking_count = models.IntegerField(default=0, editable=False)
+    pending_count = models.IntegerField(default=0, editable=False)
 
     def price_level_icon(self):
         """
@@ -50,6 +66,43 @@ class Restaurant(models.Model):
             return ""
         return "$" * int(self.price_level)
     
+    def _photo_variant(self, variant):
+        from .images import PhotoVariant
+
+        entry = (self.photo_derivatives or {}).get(variant)
+        if not self.photo or not entry:
+            return None
+        return PhotoVariant(self.photo.storage, entry)
+
+    @property
+    def card_photo(self):
+        """Thumbnail derivative (None until generated; fall back to photo.url)."""
+        return self._photo_variant("card")
+
+    @property
+    def hero_photo(self):
+        """Detail-page banner derivative (None until generated)."""
+        return self._photo_variant("hero")
+
+    @property
+    def confirmed_covers_today(self):
+        """Guests in CONFIRMED reservations for today (a DailyCovers lookup)."""
+        from django.utils import timezone
+
+        row = self.daily_covers.filter(date=timezone.localdate()).values_list("confirmed_covers", flat=True).first()
+        return row or 0
+
+    def save(self, *args, **kwargs):
+        # Counters only move through F() updates; an instance loaded before a
+        # reservation changed must not write its stale copy back.
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            from .counters import COUNTER_FIELDS
+
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def update_average_rating(self):
         """
         Recalculate and store the average rating from RestaurantRating.
@@ -59,6 +112,14 @@ class Restaurant(models.Model):
         self.save(update_fields=["rating"])
 
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"], name="restaurant_name_idx"),         # browse / dashboard order
+            models.Index(fields=["-rating"], name="restaurant_rating_idx"),    # API default ordering
+            models.Index(fields=["cuisine"], name="restaurant_cuisine_idx"),
+            # icontains search uses Postgres trigram indexes, see migration 0013
+        ]
+
     def __str__(self):
         return self.name
     
@@ -121,6 +182,78 @@ class Reservation(models.Model):
 
     class Meta:
         ordering = ["reservation_date", "reservation_time"]
+        indexes = [
+            # customer dashboard
+            models.Index(fields=["customer", "reservation_date", "reservation_time"], name="resv_customer_when_idx"),
+            # owner dashboard (restaurant__owner join, status + upcoming dates)
+            models.Index(fields=["restaurant", "status", "reservation_date"], name="resv_rest_status_date_idx"),
+            # owner exports, ordered by date/time
+            models.Index(fields=["restaurant", "reservation_date", "reservation_time"], name="resv_rest_when_idx"),
+            # bookings still holding a table
+            models.Index(
+                fields=["restaurant", "reservation_date", "reservation_time"],
+                condition=models.Q(status__in=["PENDING", "CONFIRMED"]),
+                name="resv_open_when_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Saves the row and moves the restaurant counters in one transaction."""
+        from .counters import apply_change, counted_state
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not COUNTED_FIELDS.intersection(update_fields):
+            return super().save(*args, **kwargs)
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            before = None
+            if not self._state.adding and self.pk is not None:
+                before = (
+                    Reservation.objects.using(using)
+                    .select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("restaurant", "status", "reservation_date", "party_size")
+                    .order_by()
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            apply_change(before, counted_state(self), using)
+
+    def delete(self, using=None, keep_parents=False):
+        # The post_delete receiver uncounts this instance; make it the stored row
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            stored = (
+                Reservation.objects.using(using)
+                .select_for_update()
+                .filter(pk=self.pk)
+                .values("restaurant_id", "status", "reservation_date", "party_size")
+                .order_by()
+                .first()
+            )
+            for field, value in (stored or {}).items():
+                setattr(self, field, value)
+            return super().delete(using, keep_parents)
 
     def __str__(self):
         return f"{self.customer} -> {self.restaurant} @ {self.reservation_date} {self.reservation_time}"
+
+
+# Reservation fields the counters depend on
+COUNTED_FIELDS = {"restaurant", "restaurant_id", "status", "reservation_date", "party_size"}
+
+
+class DailyCovers(models.Model):
+    """Guests in CONFIRMED reservations per restaurant and day (see restaurants/counters.py)."""
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name="daily_covers")
+    date = models.DateField()
+    confirmed_covers = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["restaurant", "date"], name="daily_covers_restaurant_date_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant} {self.date}: {self.confirmed_covers}"
@@ -0,0 +1,59 @@
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is opt-in
+    msgpack = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer that encodes with orjson when it can.
+    - Only used for the default compact/unicode/strict output, where orjson
+      produces the same bytes as DRF's json.dumps call.
+    - Anything else (indent requested, unsupported types) goes through DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:  # orjson.JSONEncodeError (Decimal, datetime, lazy strings...)
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping DRF applies for JavaScript line/paragraph separators
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Binary renderer for internal service-to-service calls.
+    Clients opt in with ``Accept: application/msgpack`` or ``?format=msgpack``.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, use_bin_type=True, default=str)
+
+
+API_RENDERER_CLASSES = [FastJSONRenderer, BrowsableAPIRenderer]
+if msgpack is not None:
+    API_RENDERER_CLASSES.append(MessagePackRenderer)
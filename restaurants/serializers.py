@@ -4,4 +4,112 @@ from .models import Restaurant
 class RestaurantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Restaurant
-        fields = '__all__'
+        # Explicit so that new model columns (photo pipeline state, the
+        # reservation counters kept by counters.py) stay out of the API
+        fields = (
+            "id",
+            "owner",
+            "name",
+            "address",
+            "cuisine",
+            "capacity",
+            "description",
+            "price_level",
+            "opening_hours",
+            "photo",
+            "rating",
+        )
+
+
+# ---------- Fast read path ----------
+# Fields whose to_representation() is a no-op for the values the DB driver returns.
+_IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class RowPlan:
+    """
+    Precompiled read plan for a ModelSerializer.
+
+    Introspects the serializer's fields once and turns each into a
+    (key, column, converter) triple, so list/retrieve can build rows straight
+    from ``.values_list()`` tuples instead of running the full serializer.
+    Output is identical to ``serializer_class(many=True).data``.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = False
+
+    def _compile(self):
+        serializer = self.serializer_class()
+        model = serializer.Meta.model
+        keys, columns, converters, file_columns = [], [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            model_field = model._meta.get_field(field.source)
+            keys.append(name)
+            columns.append(model_field.attname)
+            if isinstance(field, serializers.FileField):
+                converters.append(None)
+                file_columns.append((len(converters) - 1, model_field.storage))
+            elif isinstance(field, _IDENTITY_FIELDS) and not getattr(field, "binary", False):
+                converters.append(None)
+            else:
+                converters.append(field.to_representation)
+        self.keys = tuple(keys)
+        self.columns = tuple(columns)
+        self._converters = tuple(
+            (i, fn) for i, fn in enumerate(converters) if fn is not None
+        )
+        self._file_columns = tuple(file_columns)
+        self._compiled = True
+
+    def values(self, queryset):
+        """Return the queryset narrowed to the planned columns, as tuples."""
+        if not self._compiled:
+            self._compile()
+        return queryset.values_list(*self.columns)
+
+    def rows(self, tuples, request=None):
+        """Convert ``values()`` tuples into serializer-equivalent dicts."""
+        if not self._compiled:
+            self._compile()
+        keys = self.keys
+        converters = self._converters
+        file_columns = self._file_columns
+        out = []
+        for row in tuples:
+            row = list(row)
+            for i, fn in converters:
+                if row[i] is not None:
+                    row[i] = fn(row[i])
+            for i, storage in file_columns:
+                row[i] = _file_url(row[i], storage, request)
+            out.append(dict(zip(keys, row)))
+        return out
+
+    def row_from_instance(self, instance, request=None):
+        """Single-object variant used by retrieve()."""
+        if not self._compiled:
+            self._compile()
+        return self.rows([[getattr(instance, c) for c in self.columns]], request)[0]
+
+
+def _file_url(name, storage, request):
+    # Mirrors rest_framework.fields.FileField.to_representation (use_url=True)
+    if not name:
+        return None
+    url = storage.url(str(name))
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+restaurant_rows = RowPlan(RestaurantSerializer)
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.metrics import record_reservation
+
+from .cache import bump_restaurant
+from .counters import apply_change, counted_state
+from .models import Reservation, Restaurant, RestaurantRating
+
+
+# Bump after commit so a request can't rebuild the page from pre-commit data
+# under the new version.
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_changed(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: bump_restaurant(pk))
+
+
+@receiver(post_save, sender=RestaurantRating)
+@receiver(post_delete, sender=RestaurantRating)
+def rating_changed(sender, instance, **kwargs):
+    pk = instance.restaurant_id
+    transaction.on_commit(lambda: bump_restaurant(pk))
+
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and "status" in update_fields):
+        status = instance.status
+        transaction.on_commit(lambda: record_reservation(status))
+
+
+# post_delete also fires for QuerySet.delete() and cascades (customer deleted)
+@receiver(post_delete, sender=Reservation)
+def reservation_deleted(sender, instance, using, **kwargs):
+    apply_change(counted_state(instance), None, using)
@@ -0,0 +1,44 @@
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def restaurant_photo(restaurant, variant="card", sizes=None, alt="", css_class="", loading="lazy"):
+    """
+    Responsive <picture> for a restaurant photo derivative.
+    - WebP <source> plus a JPEG <img> fallback, both with width-descriptor srcset.
+    - Falls back to the original upload until derivatives exist.
+    - Paints the inline preview / dominant colour behind the <img> until it loads.
+    - Renders nothing when the restaurant has no photo.
+
+    Usage: {% restaurant_photo r "card" sizes="80px" alt=r.name css_class="thumb-img" %}
+    """
+    if not restaurant.photo:
+        return ""
+    style = _placeholder_style(restaurant)
+    photo = getattr(restaurant, f"{variant}_photo", None)
+    if photo is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="{}" decoding="async">',
+            restaurant.photo.url, alt, css_class, style, loading,
+        )
+    sizes = sizes or f"{photo.width}px"
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" style="{}" loading="{}" decoding="async">'
+        '</picture>',
+        photo.webp_srcset, sizes,
+        photo.src, photo.jpeg_srcset, sizes, photo.width, photo.height, alt, css_class, style, loading,
+    )
+
+
+def _placeholder_style(restaurant):
+    parts = []
+    if restaurant.photo_color:
+        parts.append(f"background-color:{restaurant.photo_color}")
+    if restaurant.photo_lqip:
+        parts.append(f"background-image:url({restaurant.photo_lqip});background-size:cover;background-position:center")
+    return ";".join(parts)
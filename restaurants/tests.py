@@ -1,3 +1,684 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import os
+import re
+import tempfile
+import time
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, connections
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+
+from accounts.auth_backend import EmailBackend
+from accounts.models import StaffInvitation, User
+
+from .async_views import restaurant_api_detail
+from .cache import restaurant_version
+from .images import (
+    PHOTO_FAILED,
+    PHOTO_INTERRUPTED,
+    PHOTO_VARIANTS,
+    finish_photo_upload,
+    process_staged_photo,
+    refresh_photo_derivatives,
+)
+from .models import DailyCovers, Reservation, Restaurant
+from .renderers import FastJSONRenderer, msgpack
+from .serializers import RestaurantSerializer, restaurant_rows
+
+OWNERS = 200
+CUSTOMERS = 400
+RESERVATIONS_PER_RESTAURANT = 60
+
+
+def sequential_scans(sql):
+    """Tables the backend's plan for `sql` reads in full (empty list = index-only access)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("EXPLAIN " + sql)
+            return re.findall(r"Seq Scan on (\w+)", "\n".join(row[0] for row in cursor.fetchall()))
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plan = "\n".join(row[-1] for row in cursor.fetchall())
+            # "SCAN t" is a full table scan; "SCAN t USING INDEX i" walks an index in order
+            return [m.group(1) for m in re.finditer(r"\bSCAN (\w+)\b(?! USING)", plan)]
+    return []
+
+
+class HotQueryPlanTests(TestCase):
+    """
+    Every dashboard/browse/export query must be answerable from an index once
+    the tables hold a realistic amount of data (and statistics are fresh).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        owners = User.objects.bulk_create(
+            User(email=f"owner{i}@example.com", username=f"owner{i}", role=User.Roles.OWNER, password="!")
+            for i in range(OWNERS)
+        )
+        customers = User.objects.bulk_create(
+            User(email=f"customer{i}@example.com", username=f"customer{i}", password="!")
+            for i in range(CUSTOMERS)
+        )
+        cuisines = ["Lebanese", "Burger", "Sushi", "Pizza", "Cafe", "Thai", "Indian", "Greek"]
+        restaurants = Restaurant.objects.bulk_create(
+            Restaurant(
+                owner=owner,
+                name=f"Restaurant {i:04d}",
+                address=f"{i} Main Street",
+                cuisine=cuisines[i % len(cuisines)],
+                capacity=40,
+                rating=i % 50 / 10,
+            )
+            for i, owner in enumerate(owners)
+        )
+        today = timezone.localdate()
+        statuses = list(Reservation.Status.values)
+        Reservation.objects.bulk_create(
+            Reservation(
+                restaurant=restaurant,
+                customer=customers[(r * 7 + n) % CUSTOMERS],
+                reservation_date=today + datetime.timedelta(days=n - 30),
+                reservation_time=datetime.time(12 + n % 10, 0),
+                party_size=2 + n % 4,
+                status=statuses[n % len(statuses)],
+            )
+            for r, restaurant in enumerate(restaurants)
+            for n in range(RESERVATIONS_PER_RESTAURANT)
+        )
+        StaffInvitation.objects.bulk_create(
+            StaffInvitation(
+                email=f"staff{i}-{n}@example.com",
+                restaurant=restaurant,
+                token=StaffInvitation.create_token(),
+                invited_by=restaurant.owner,
+                expires_at=timezone.now() + datetime.timedelta(days=n - 2),
+            )
+            for i, restaurant in enumerate(restaurants)
+            for n in range(5)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.owner = owners[OWNERS // 2]
+        cls.customer = customers[CUSTOMERS // 2]
+
+    def setUp(self):
+        cache.clear()  # page/user caches would hide the queries
+
+    def assertIndexed(self, label, run, full_reads=()):
+        """
+        Every SELECT that `run` sends (the view's own querysets, captured as
+        SQL) must be served from an index. `full_reads` lists tables a query
+        reads entirely by design (an unpaginated list, a catalogue COUNT).
+        """
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        selects = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertTrue(selects, f"{label} ran no queries")
+        for sql in selects:
+            scans = [table for table in sequential_scans(sql) if table not in full_reads]
+            self.assertEqual(scans, [], f"{label} falls back to a sequential scan:\n{sql}")
+
+    def get(self, url_name, user=None, **params):
+        if user is not None:
+            self.client.force_login(user)
+        return lambda: self.assertEqual(self.client.get(reverse(url_name), params).status_code, 200)
+
+    def test_browse_and_api_ordering(self):
+        catalogue_count = ("restaurants_restaurant",)  # paginator COUNT(*) over every row
+        self.assertIndexed("browse list", self.get("restaurant_browse"), catalogue_count)
+        self.assertIndexed("API default ordering", self.get("restaurant-list"))
+        self.assertIndexed("cuisine filter", self.get("restaurant_browse", cuisine="Sushi"), catalogue_count)
+
+    def test_case_insensitive_lookups(self):
+        if connection.vendor != "postgresql":
+            # SQLite compiles these to LIKE, which neither index can serve
+            self.skipTest("UPPER()/pg_trgm expression indexes are Postgres only")
+        self.assertIndexed(
+            "login", lambda: EmailBackend().authenticate(None, email="OWNER7@example.com", password="pw")
+        )
+        self.assertIndexed("browse search", self.get("restaurant_browse", q="0042"))
+        self.assertIndexed("API search", self.get("restaurant-list", search="sush"))
+
+    def test_customer_dashboard(self):
+        # The restaurant cards list every restaurant; the reservations must not
+        self.assertIndexed(
+            "customer dashboard", self.get("customer_dashboard", self.customer), ("restaurants_restaurant",)
+        )
+
+    def test_owner_dashboard(self):
+        self.assertIndexed("owner dashboard", self.get("owner_dashboard", self.owner))
+
+    def test_invite_duplicate_check(self):
+        self.client.force_login(self.owner)
+
+        def invite():
+            self.client.post(reverse("bulk_invitations"), {"emails": "staff1-1@example.com, new@example.com"})
+
+        self.assertIndexed("invite duplicate check", invite)
+
+    def test_owner_export(self):
+        self.client.force_login(self.owner)
+
+        def export():  # the rows are only read while the response streams
+            b"".join(self.client.get(reverse("owner_reservations_export")).streaming_content)
+
+        self.assertIndexed("reservation export", export)
+
+
+class ReservationCounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()  # cached users/pages from other tests share primary keys with ours
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+        cls.customer = User.objects.create_user("customer@example.com", "pw")
+        cls.restaurant = Restaurant.objects.create(
+            owner=cls.owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=40
+        )
+        cls.today = timezone.localdate()
+
+    def book(self, party_size=4):
+        return Reservation.objects.create(
+            restaurant=self.restaurant,
+            customer=self.customer,
+            reservation_date=self.today,
+            reservation_time=datetime.time(20, 0),
+            party_size=party_size,
+        )
+
+    def assertCounters(self, bookings, pending, covers):
+        self.restaurant.refresh_from_db()
+        self.assertEqual(
+            (self.restaurant.booking_count, self.restaurant.pending_count, self.restaurant.confirmed_covers_today),
+            (bookings, pending, covers),
+        )
+
+    def test_transitions(self):
+        first, second = self.book(4), self.book(2)
+        self.assertCounters(2, 2, 0)
+
+        self.client.force_login(self.owner)
+        self.client.post(reverse("owner_confirm_reservation", args=[first.pk]))
+        self.assertCounters(2, 1, 4)
+        self.client.post(reverse("owner_decline_reservation", args=[second.pk]))
+        self.assertCounters(2, 0, 4)
+
+        self.client.force_login(self.customer)
+        self.client.post(reverse("cancel_reservation", args=[first.pk]))
+        self.assertCounters(2, 0, 0)
+
+        second.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_stale_restaurant_save_keeps_counters(self):
+        stale = Restaurant.objects.get(pk=self.restaurant.pk)
+        self.book()
+        stale.name = "Tawlet Beirut"
+        stale.save()
+        self.assertCounters(1, 1, 0)
+
+    def test_repair_command(self):
+        self.book(3)
+        self.book(5)
+        Reservation.objects.update(status=Reservation.Status.CONFIRMED)  # bypasses save()
+        self.assertCounters(2, 2, 0)
+        call_command("repair_reservation_counters", stdout=StringIO())
+        self.assertCounters(2, 0, 8)
+        self.assertEqual(DailyCovers.objects.count(), 1)
+
+
+class ExportTests(TestCase):
+    """Streaming owner exports: chunked output, keyset fallback, CSV formula cells."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+        cls.customer = User.objects.create_user(
+            "customer@example.com", "pw", first_name="=HYPERLINK(\"http://evil\")", last_name="Haddad"
+        )
+        restaurant = Restaurant.objects.create(
+            owner=cls.owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=40
+        )
+        notes = ["@SUM(1+1)", "-2+3", "window seat", "+961", ""]
+        for n, note in enumerate(notes):
+            Reservation.objects.create(
+                restaurant=restaurant,
+                customer=cls.customer,
+                reservation_date=timezone.localdate() + datetime.timedelta(days=n % 2),
+                reservation_time=datetime.time(19 + n % 3, 0),
+                party_size=n + 1,
+                notes=note,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+
+    def export(self, fmt):
+        response = self.client.get(reverse("owner_reservations_export"), {"format": fmt})
+        self.assertEqual(response.status_code, 200)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        return chunks, "".join(chunks)
+
+    def test_csv_formula_cells_are_quoted(self):
+        _, body = self.export("csv")
+        rows = list(csv.DictReader(body.splitlines()))
+        self.assertEqual(
+            sorted(row["notes"] for row in rows),
+            sorted(["'@SUM(1+1)", "'-2+3", "window seat", "'+961", ""]),
+        )
+        self.assertEqual({row["customer_first_name"] for row in rows}, {"'=HYPERLINK(\"http://evil\")"})
+        self.assertEqual({row["customer_last_name"] for row in rows}, {"Haddad"})
+        self.assertEqual(sorted(int(row["party_size"]) for row in rows), [1, 2, 3, 4, 5])
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_keyset_fallback_matches_cursor_export(self):
+        chunks, cursor_body = self.export("ndjson")
+        self.assertGreater(len(chunks), 1)  # flushed per chunk, not buffered
+        settings_dict = connections["default"].settings_dict
+        settings_dict["DISABLE_SERVER_SIDE_CURSORS"] = True
+        try:
+            chunks, keyset_body = self.export("ndjson")
+        finally:
+            del settings_dict["DISABLE_SERVER_SIDE_CURSORS"]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(keyset_body, cursor_body)
+        self.assertEqual(len([json.loads(line) for line in keyset_body.splitlines()]), 5)
+
+    def test_bad_date_filters(self):
+        for raw in ("2024-02-30", "2024-13-01", "yesterday"):
+            response = self.client.get(reverse("owner_reservations_export"), {"from": raw})
+            self.assertContains(response, "from must be YYYY-MM-DD", status_code=400)
+
+
+class PageCacheTests(TestCase):
+    """An owner's edit reaches the cached anonymous pages on the next request."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_edit_invalidates_browse_and_detail(self):
+        owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+        restaurant = Restaurant.objects.create(
+            owner=owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=40
+        )
+        pages = [reverse("restaurant_browse"), reverse("restaurant_detail", args=[restaurant.pk])]
+        for page in pages:
+            self.assertContains(self.client.get(page), "Tawlet")
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant.name = "Tawlet Beirut"
+            restaurant.save()
+        for page in pages:
+            self.assertContains(self.client.get(page), "Tawlet Beirut")
+
+
+    def test_writes_invalidate_card_and_detail_fragments(self):
+        owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+        customer = User.objects.create_user("customer@example.com", "pw", role=User.Roles.CUSTOMER)
+        restaurant = Restaurant.objects.create(
+            owner=owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=40
+        )
+        browse, detail = reverse("restaurant_browse"), reverse("restaurant_detail", args=[restaurant.pk])
+
+        def render():
+            # Logged-in browse is built from cached cards; anonymous detail is a cached page
+            self.client.force_login(customer)
+            card = self.client.get(browse)
+            self.client.logout()
+            return card, self.client.get(detail)
+
+        for response in render():
+            self.assertContains(response, "Tawlet")
+            self.assertContains(response, '<span class="rating-pill-value">0.0</span>', html=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant.cuisine = "Armenian"
+            restaurant.save()
+        for response in render():
+            self.assertContains(response, "Armenian")
+
+        self.client.force_login(customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("rate_restaurant", args=[restaurant.pk]), {"score": "4", "next": browse})
+        for response in render():
+            self.assertContains(response, '<span class="rating-pill-value">4.0</span>', html=True)
+
+
+class MediaGcTests(TestCase):
+    """Shared content-addressed blobs and gc_media's grace period."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def stored(self, content, age):
+        name = default_storage.save("restaurant_photos/upload.jpg", ContentFile(content))
+        then = time.time() - age
+        os.utime(default_storage.path(name), (then, then))
+        return name
+
+    def gc(self, **options):
+        call_command("gc_media", grace=3600, stdout=StringIO(), **options)
+
+    def test_reused_blob_gets_a_fresh_grace_period(self):
+        reused = self.stored(b"menu", 7200)
+        orphan = self.stored(b"old menu", 7200)
+        self.assertEqual(default_storage.save("restaurant_photos/again.jpg", ContentFile(b"menu")), reused)
+
+        self.gc()
+        self.assertTrue(default_storage.exists(reused))
+        self.assertFalse(default_storage.exists(orphan))
+
+    def test_blob_referenced_during_the_walk_is_kept(self):
+        name = self.stored(b"menu", 7200)
+        with mock.patch(
+            "restaurants.management.commands.gc_media.referenced_names", side_effect=[set(), {name}]
+        ):
+            self.gc()
+        self.assertTrue(default_storage.exists(name))
+
+
+class PhotoUploadRecoveryTests(TestCase):
+    """Lost or failed background photo jobs never leave an upload "processing" forever."""
+
+    def setUp(self):
+        cache.clear()
+        self.staging = tempfile.TemporaryDirectory()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.staging.cleanup)
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(PHOTO_STAGING_DIR=self.staging.name, MEDIA_ROOT=media.name))
+        self.owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+
+    def queued(self, name, content=None, age=3600):
+        """A restaurant whose upload `name` was queued `age` seconds ago."""
+        if content is not None:
+            self.stage(name, content, age)
+        return Restaurant.objects.create(
+            owner=self.owner, name=name, address="Hamra", cuisine="Lebanese", capacity=20,
+            photo_processing=True, photo_staged=name,
+            photo_queued_at=timezone.now() - datetime.timedelta(seconds=age),
+        )
+
+    def stage(self, name, content, age):
+        path = os.path.join(self.staging.name, name)
+        with open(path, "wb") as fh:
+            fh.write(content)
+        os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    def test_finishing_an_upload_invalidates_cached_pages(self):
+        restaurant = self.queued("menu.jpg")
+        before = restaurant_version(restaurant.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(finish_photo_upload(restaurant.pk, "stale.jpg"), 0)
+        self.assertEqual(restaurant_version(restaurant.pk), before)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(finish_photo_upload(restaurant.pk, "menu.jpg", photo_error=""), 1)
+        self.assertNotEqual(restaurant_version(restaurant.pk), before)
+
+    def test_sweep(self):
+        buf = BytesIO()
+        Image.new("RGB", (40, 30), "red").save(buf, "PNG")
+        retried = self.queued("retried", buf.getvalue())
+        lost = self.queued("lost")  # staged on another pod
+        recent = self.queued("recent", b"...", age=10)
+        self.stage("orphan", b"...", age=3600)
+
+        call_command("sweep_photo_uploads", stdout=StringIO())
+
+        retried.refresh_from_db()
+        self.assertEqual((retried.photo_processing, retried.photo_error), (False, ""))
+        self.assertTrue(retried.photo and retried.photo_derivatives)
+        lost.refresh_from_db()
+        self.assertEqual((lost.photo_processing, lost.photo_error), (False, PHOTO_INTERRUPTED))
+        recent.refresh_from_db()
+        self.assertTrue(recent.photo_processing)  # may still be running
+        self.assertEqual(sorted(os.listdir(self.staging.name)), ["recent"])
+
+    def test_failure_is_shown_to_owner(self):
+        restaurant = self.queued("broken")
+        with self.assertLogs("restaurants.images", "ERROR"):
+            process_staged_photo(restaurant.pk, self.stage("broken", b"not an image", 0), "menu.jpg")
+        restaurant.refresh_from_db()
+        self.assertEqual((restaurant.photo_processing, restaurant.photo_error), (False, PHOTO_FAILED))
+        self.assertEqual(os.listdir(self.staging.name), [])
+
+        self.client.force_login(self.owner)
+        self.assertContains(self.client.get(reverse("owner_restaurant_edit")), "couldn&#x27;t process your last photo")
+
+
+class InlinePool:
+    """Stands in for the photo thread pool: runs the job at once."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def image_bytes(size, fmt="JPEG", exif=None):
+    buf = BytesIO()
+    Image.new("RGB", size, "teal").save(buf, fmt, **({"exif": exif} if exif is not None else {}))
+    return buf.getvalue()
+
+
+class PhotoPipelineTests(TestCase):
+    """Derivatives, the API upload path and {% restaurant_photo %}."""
+
+    def setUp(self):
+        cache.clear()
+        staging, media = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(staging.cleanup)
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(PHOTO_STAGING_DIR=staging.name, MEDIA_ROOT=media.name))
+        self.enterContext(mock.patch("restaurants.images._pool", return_value=InlinePool()))
+        self.owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+
+    def restaurant(self, photo_size=None):
+        restaurant = Restaurant.objects.create(
+            owner=self.owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=40
+        )
+        if photo_size:
+            restaurant.photo.save("menu.png", ContentFile(image_bytes(photo_size, "PNG")))
+        return restaurant
+
+    def stored_image(self, name):
+        with default_storage.open(name) as fh:
+            image = Image.open(fh)
+            image.load()
+        return image
+
+    def test_derivative_sizes_and_formats(self):
+        restaurant = self.restaurant((2000, 1000))
+        refresh_photo_derivatives(restaurant)
+        restaurant.refresh_from_db()
+        for variant, (width, height) in PHOTO_VARIANTS.items():
+            entry = restaurant.photo_derivatives[variant]
+            self.assertEqual((entry["width"], entry["height"]), (width, height))
+            for scale in (1, 2):
+                for ext, fmt in (("webp", "WEBP"), ("jpeg", "JPEG")):
+                    image = self.stored_image(entry[f"{ext}@{scale}x"])
+                    self.assertEqual((image.format, image.size), (fmt, (width * scale, height * scale)))
+        self.assertTrue(restaurant.photo_lqip.startswith("data:image/jpeg;base64,"))
+        self.assertRegex(restaurant.photo_color, r"^#[0-9a-f]{6}$")
+
+        restaurant.photo = None
+        refresh_photo_derivatives(restaurant)
+        restaurant.refresh_from_db()
+        self.assertEqual((restaurant.photo_derivatives, restaurant.photo_lqip), ({}, ""))
+
+    def test_no_2x_from_a_small_source(self):
+        restaurant = self.restaurant((100, 100))
+        refresh_photo_derivatives(restaurant)
+        card = restaurant.photo_derivatives["card"]
+        self.assertEqual(sorted(key for key in card if "@" in key), ["jpeg@1x", "webp@1x"])
+
+    def test_photo_tag(self):
+        template = Template('{% load restaurant_tags %}{% restaurant_photo r "card" alt="Tawlet" %}')
+        self.assertEqual(template.render(Context({"r": self.restaurant()})), "")
+
+        restaurant = self.restaurant((400, 400))
+        fallback = template.render(Context({"r": restaurant}))  # before derivatives exist
+        self.assertHTMLEqual(
+            fallback,
+            f'<img src="{restaurant.photo.url}" alt="Tawlet" class="" style="" loading="lazy" decoding="async">',
+        )
+
+        refresh_photo_derivatives(restaurant)
+        html = template.render(Context({"r": restaurant}))
+        card = restaurant.photo_derivatives["card"]
+        url = default_storage.url
+        self.assertInHTML(
+            f'<source type="image/webp" srcset="{url(card["webp@1x"])} 80w, {url(card["webp@2x"])} 160w" sizes="80px">',
+            html,
+        )
+        self.assertIn(f'src="{url(card["jpeg@1x"])}"', html)
+        self.assertIn(f'srcset="{url(card["jpeg@1x"])} 80w, {url(card["jpeg@2x"])} 160w"', html)
+        self.assertIn(f"background-color:{restaurant.photo_color}", html)
+
+    def test_api_uploads_go_through_the_pipeline(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"  # Make
+        exif[0x8825] = {2: (33.0, 53.0, 0.0)}  # GPSInfo
+        self.client.force_login(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("restaurant-list"), {
+                "owner": self.owner.pk, "name": "Tawlet", "address": "Mar Mikhael", "cuisine": "Lebanese",
+                "capacity": 40, "photo": SimpleUploadedFile("menu.jpg", image_bytes((400, 300), exif=exif)),
+            })
+        self.assertEqual(response.status_code, 201, response.content)
+        restaurant = Restaurant.objects.get(pk=response.json()["id"])
+        self.assertFalse(restaurant.photo_processing)
+        self.assertEqual(set(restaurant.photo_derivatives), set(PHOTO_VARIANTS))
+        self.assertTrue(restaurant.photo_lqip)
+        self.assertEqual(dict(self.stored_image(restaurant.photo.name).getexif()), {})
+
+        first = restaurant.photo.name
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse("restaurant-detail", args=[restaurant.pk]),
+                encode_multipart(BOUNDARY, {"photo": SimpleUploadedFile("new.png", image_bytes((300, 300), "PNG"))}),
+                content_type=MULTIPART_CONTENT,
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        restaurant.refresh_from_db()
+        self.assertNotEqual(restaurant.photo.name, first)
+        self.assertTrue(restaurant.photo.name.endswith(".jpg"))  # re-encoded
+        self.assertEqual(restaurant.photo_derivatives["card"]["width"], 80)
+
+
+class RestaurantApiTests(TestCase):
+    """What the public API exposes per restaurant, and that the fast read path matches the serializer."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_rows_leave_out_internals(self):
+        owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+        Restaurant.objects.create(
+            owner=owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=40,
+            photo_lqip="data:image/jpeg;base64," + "A" * 600, photo_derivatives={"card": {}},
+        )
+        row = self.client.get(reverse("restaurant-list")).json()[0]
+        for field in (
+            "photo_derivatives", "photo_lqip", "photo_processing", "photo_staged", "photo_error",
+            "booking_count", "pending_count",
+        ):
+            self.assertNotIn(field, row)
+        self.assertIn("photo", row)
+
+    def create_restaurants(self):
+        owner = User.objects.create_user("owner@example.com", "pw", role=User.Roles.OWNER)
+        return [
+            Restaurant.objects.create(
+                owner=owner, name="Barbar — Café ☕", address="Hamra\u2028Street", cuisine="Lebanese",
+                capacity=40, price_level=2, rating=Decimal("4.5"), photo="restaurant_photos/barbar.jpg",
+                opening_hours={"Mon": {"open": "09:00", "close": "23:00"}},
+            ),
+            Restaurant.objects.create(
+                owner=owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=12,
+                description="", rating=Decimal("3"),
+            ),
+        ]
+
+    def serializer_bytes(self, data, renderer=JSONRenderer):
+        return renderer().render(data, "application/json")
+
+    def test_fast_rows_match_the_serializer(self):
+        restaurants = self.create_restaurants()
+        request = RequestFactory().get("/api/restaurants/")
+        queryset = Restaurant.objects.order_by("-rating")
+        expected = RestaurantSerializer(queryset, many=True, context={"request": request}).data
+        rows = restaurant_rows.rows(restaurant_rows.values(queryset), request)
+        self.assertEqual(FastJSONRenderer().render(rows), self.serializer_bytes(expected))
+        self.assertEqual((rows[0]["rating"], rows[1]["photo"]), ("4.5", None))
+        for restaurant in restaurants:
+            self.assertEqual(
+                FastJSONRenderer().render(restaurant_rows.row_from_instance(restaurant, request)),
+                self.serializer_bytes(RestaurantSerializer(restaurant, context={"request": request}).data),
+            )
+
+    def test_api_responses_match_the_serializer(self):
+        restaurants = self.create_restaurants()
+        request = RequestFactory().get("/")  # same host as the test client: absolute photo URLs
+        response = self.client.get(reverse("restaurant-list"))
+        expected = RestaurantSerializer(
+            Restaurant.objects.order_by("-rating"), many=True, context={"request": request}
+        ).data
+        self.assertEqual(response.content, self.serializer_bytes(expected))
+        for restaurant in restaurants:
+            response = self.client.get(reverse("restaurant-detail", args=[restaurant.pk]))
+            expected = RestaurantSerializer(restaurant, context={"request": request}).data
+            self.assertEqual(response.content, self.serializer_bytes(expected))
+
+    @skipUnless(msgpack, "msgpack is opt-in")
+    def test_messagepack(self):
+        self.create_restaurants()
+        json_rows = self.client.get(reverse("restaurant-list")).json()
+        response = self.client.get(reverse("restaurant-list"), HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), json_rows)
+        restaurant = Restaurant.objects.get(name="Tawlet")
+        response = self.client.get(reverse("restaurant-detail", args=[restaurant.pk]), {"format": "msgpack"})
+        self.assertEqual(msgpack.unpackb(response.content)["rating"], "3.0")
+
+    async def test_async_detail_answers_like_the_viewset(self):
+        async def anonymous():
+            return AnonymousUser()
+
+        owner = await User.objects.acreate(email="owner@example.com", role=User.Roles.OWNER)
+        restaurant = await Restaurant.objects.acreate(
+            owner=owner, name="Tawlet", address="Mar Mikhael", cuisine="Lebanese", capacity=40,
+        )
+        for pk in (str(restaurant.pk), str(restaurant.pk + 1), "abc"):
+            path = reverse("restaurant-detail", args=[pk])
+            expected = await self.async_client.get(path, HTTP_ACCEPT="application/json")
+            request = AsyncRequestFactory().get(path, HTTP_ACCEPT="application/json")
+            request.auser = anonymous  # what AuthenticationMiddleware would attach
+            response = await restaurant_api_detail(request, pk=pk)
+            if hasattr(response, "render"):  # DRF's answer, rendered by the handler
+                response.render()
+            self.assertEqual(
+                (response.status_code, response.content),
+                (expected.status_code, expected.content),
+                pk,
+            )
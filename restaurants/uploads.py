@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every upload straight to a temp file (never into memory) and stops
+    reading a file as soon as it passes PHOTO_UPLOAD_MAX_BYTES.
+    Rejected fields are recorded on request.rejected_uploads so the form can
+    report them (see RestaurantForm).
+    """
+
+    def _reject(self, field_name):
+        limit = filesizeformat(settings.PHOTO_UPLOAD_MAX_BYTES)
+        rejected = getattr(self.request, "rejected_uploads", {})
+        rejected[field_name] = f"File too large (max {limit})."
+        self.request.rejected_uploads = rejected
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.received = 0
+        if content_length and content_length > settings.PHOTO_UPLOAD_MAX_BYTES:
+            self.field_name = field_name
+            self._reject(field_name)
+            raise SkipFile
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.PHOTO_UPLOAD_MAX_BYTES:
+            self.file.close()  # NamedTemporaryFile: removes the partial upload
+            self._reject(self.field_name)
+            raise SkipFile
+        return super().receive_data_chunk(raw_data, start)
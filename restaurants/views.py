@@ -7,41 +7,103 @@ import datetime
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Q
+from django.http import HttpResponseBadRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView
-from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET, require_POST
 
 from rest_framework import viewsets, filters
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, SAFE_METHODS
+from rest_framework.response import Response
 
 # ---------- Local imports ----------
 from .models import Restaurant, Reservation, RestaurantRating
-from .serializers import RestaurantSerializer
+from .serializers import RestaurantSerializer, restaurant_rows
+from .renderers import API_RENDERER_CLASSES
 from .permissions import IsOwnerOrReadOnly
 from .forms import RestaurantForm
+from .images import queue_photo_upload, refresh_photo_derivatives
+from .cache import (
+    AnonymousPageCacheMixin,
+    attach_card_versions,
+    catalogue_version,
+    query_fingerprint,
+    restaurant_version,
+    viewer_role,
+)
+from .exports import FORMATS, RESERVATION_COLUMNS, RESTAURANT_COLUMNS, stream_export
 from accounts.decorators import owner_required
+from config.throttling import TokenBucketThrottle, throttle
 
 
 # ---------- API (DRF) ----------
+class RestaurantAPIThrottle(TokenBucketThrottle):
+    """Search is far more expensive than a plain list, so it gets its own bucket."""
+
+    def get_scope(self, request, view):
+        if request.method not in SAFE_METHODS:
+            return "api_write"
+        if request.query_params.get("search"):
+            return "api_search"
+        return "api_read"
+
+
 class RestaurantViewSet(viewsets.ModelViewSet):
     """
     REST API for restaurants.
     - Authenticated users can create/update/delete their own restaurants.
     - Everyone can read.
     - Supports ?search= and ?ordering=.
+    - list/retrieve skip the serializer and build rows from .values()
+      (see serializers.RowPlan); writes still go through RestaurantSerializer.
+    - Uploaded photos take the same background pipeline as owner uploads
+      (EXIF stripped, derivatives, placeholder), see restaurants/images.py.
+    - list/retrieve (incl. ?search=) read from a replica (config/db_routing.py).
     """
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
+    replica_actions = ("list", "retrieve")
+    renderer_classes = API_RENDERER_CLASSES
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    throttle_classes = [RestaurantAPIThrottle]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["name", "cuisine", "address"]
     ordering_fields = ["rating", "capacity", "name"]
     ordering = ["-rating"]
 
+    def list(self, request, *args, **kwargs):
+        queryset = restaurant_rows.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(restaurant_rows.rows(page, request))
+        return Response(restaurant_rows.rows(queryset, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return Response(restaurant_rows.row_from_instance(instance, request))
+
     def perform_create(self, serializer):
         # Attach the logged-in user as owner on create
-        serializer.save(owner=self.request.user)
+        self._save_with_photo(serializer, owner=self.request.user)
+
+    def perform_update(self, serializer):
+        self._save_with_photo(serializer)
+
+    def _save_with_photo(self, serializer, **extra):
+        if "photo" not in serializer.validated_data:
+            serializer.save(**extra)
+            return
+        upload = serializer.validated_data.pop("photo")
+        previous_photo = serializer.instance.photo.name if serializer.instance else None
+        if upload:
+            # keep serving the current photo until the new one is ready
+            restaurant = serializer.save(**extra)
+            queue_photo_upload(restaurant, upload, previous_photo)
+        else:  # cleared
+            refresh_photo_derivatives(serializer.save(photo=None, **extra))
 
 
 # ---------- Owner site views (HTML pages) ----------
@@ -57,12 +119,18 @@ def owner_restaurant_create(request):
         return redirect("owner_restaurant_edit")
 
     if request.method == "POST":
-        form = RestaurantForm(request.POST,request.FILES)
+        form = RestaurantForm(request.POST,request.FILES,rejected_uploads=getattr(request, "rejected_uploads", None))
         if form.is_valid():
             r = form.save(commit=False)
             r.owner = request.user
-            r.save()
+            upload = form.cleaned_data.get("photo")
+            if upload:
+                queue_photo_upload(r, upload)
+            else:
+                r.save()
             messages.success(request, "Restaurant created.")
+            if upload:
+                messages.info(request, "Your photo is being processed and will appear shortly.")
             return redirect("owner_restaurant_edit")
     else:
         form = RestaurantForm()
@@ -87,10 +155,21 @@ def owner_restaurant_edit(request):
         return redirect("owner_restaurant_create")
 
     if request.method == "POST":
-        form = RestaurantForm(request.POST,request.FILES,instance=restaurant)
+        previous_photo = restaurant.photo.name
+        form = RestaurantForm(request.POST,request.FILES,instance=restaurant,rejected_uploads=getattr(request, "rejected_uploads", None))
         if form.is_valid():
-            form.save()
+            r = form.save(commit=False)
+            upload = form.cleaned_data.get("photo") if "photo" in form.changed_data else None
+            if upload:
+                # keep showing the current photo until the new one is ready
+                queue_photo_upload(r, upload, previous_photo)
+            else:
+                r.save()
+                if "photo" in form.changed_data:  # cleared
+                    refresh_photo_derivatives(r)
             messages.success(request, "Restaurant updated.")
+            if upload:
+                messages.info(request, "Your new photo is being processed and will appear shortly.")
             return redirect("owner_restaurant_edit")
     else:
         form = RestaurantForm(instance=restaurant)
@@ -102,19 +181,95 @@ def owner_restaurant_edit(request):
     )
 
 
+# ---------- Streaming exports ----------
+@login_required
+@owner_required
+@require_GET
+def owner_reservations_export(request):
+    """
+    Owner downloads their booking history.
+    - ?format=csv (default) or ndjson
+    - Optional filters: ?restaurant=<id>&from=YYYY-MM-DD&to=YYYY-MM-DD
+    """
+    fmt = request.GET.get("format", "csv")
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+
+    qs = Reservation.objects.filter(restaurant__owner=request.user)
+    restaurant_id = request.GET.get("restaurant")
+    if restaurant_id:
+        if not restaurant_id.isdigit():
+            return HttpResponseBadRequest("restaurant must be an id")
+        qs = qs.filter(restaurant_id=restaurant_id)
+    for param, lookup in (("from", "reservation_date__gte"), ("to", "reservation_date__lte")):
+        raw = request.GET.get(param)
+        if raw:
+            try:
+                day = parse_date(raw)
+            except ValueError:  # well formed but not a date, e.g. 2024-02-30
+                day = None
+            if day is None:
+                return HttpResponseBadRequest(f"{param} must be YYYY-MM-DD")
+            qs = qs.filter(**{lookup: day})
+
+    qs = qs.order_by("reservation_date", "reservation_time", "id")
+    return stream_export(qs, RESERVATION_COLUMNS, fmt, "reservations")
+
+
+@staff_member_required
+@require_GET
+def restaurants_export(request):
+    """Admin export of the whole restaurant catalogue (?format=csv|ndjson)."""
+    fmt = request.GET.get("format", "csv")
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+    qs = Restaurant.objects.order_by("id")
+    return stream_export(qs, RESTAURANT_COLUMNS, fmt, "restaurants")
+
+
 # ---------- Public browse & detail views ----------
+# Shared with the async versions in restaurants/async_views.py, which serve the
+# same URLs (and cache entries) under ASGI.
+def browse_queryset(request):
+    qs = Restaurant.objects.all().order_by("name")
+    q = request.GET.get("q", "").strip()
+    cuisine = request.GET.get("cuisine", "").strip()
+    if q:
+        qs = qs.filter(Q(name__icontains=q) | Q(address__icontains=q))
+    if cuisine:
+        qs = qs.filter(cuisine__icontains=cuisine)
+    return qs
+
+
+def browse_cache_key(request):
+    page = request.GET.get("page", "").strip()
+    fingerprint = query_fingerprint(request, ("q", "cuisine"))
+    return f"page:browse:{catalogue_version()}:{fingerprint}:{page if page != '1' else ''}"
+
+
+def detail_cache_key(pk):
+    return f"page:detail:{pk}:{restaurant_version(pk)}"
+
+
 # NOTE: Browse is guest-only by policy; if a user is logged in, we log them out here.
-class PublicRestaurantListView(ListView):
+class PublicRestaurantListView(AnonymousPageCacheMixin, ListView):
     """
     Guest browse list:
     - If a user is logged in, they are immediately logged out
       and continue browsing as an anonymous (guest) visitor.
+    - Anonymous pages are cached per catalogue version + normalized ?q/?cuisine/?page.
+    - Reads from the primary: the page and card fragments it builds are cached
+      under the version bumped by the write, so a lagging replica's copy would
+      stay cached until it expires.
     """
     template_name = "restaurants/browse.html"
     model = Restaurant
     context_object_name = "restaurants"
     paginate_by = 12
 
+    def get_page_cache_key(self):
+        return browse_cache_key(self.request)
+
     # def dispatch(self, request, *args, **kwargs):
     #     # Force any authenticated user to be logged out
     #     if request.user.is_authenticated:
@@ -122,26 +277,26 @@ class PublicRestaurantListView(ListView):
     #     return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        qs = Restaurant.objects.all().order_by("name")
-        q = self.request.GET.get("q", "").strip()
-        cuisine = self.request.GET.get("cuisine", "").strip()
-        if q:
-            qs = qs.filter(Q(name__icontains=q) | Q(address__icontains=q))
-        if cuisine:
-            qs = qs.filter(cuisine__icontains=cuisine)
-        return qs
+        return browse_queryset(self.request)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx["q"] = self.request.GET.get("q", "").strip()
         ctx["cuisine"] = self.request.GET.get("cuisine", "").strip()
+        # Card fragments are cached per restaurant version + viewer role
+        ctx["restaurants"] = attach_card_versions(list(ctx["restaurants"]))
+        ctx["viewer_role"] = viewer_role(self.request.user)
         return ctx
 
 
-class PublicRestaurantDetailView(DetailView):
+class PublicRestaurantDetailView(AnonymousPageCacheMixin, DetailView):
     template_name = "restaurants/detail.html"
     model = Restaurant
     context_object_name = "restaurant"
+    # No replica_reads: cached under the new version, see PublicRestaurantListView
+
+    def get_page_cache_key(self):
+        return detail_cache_key(self.kwargs["pk"])
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -203,6 +358,7 @@ class PublicRestaurantDetailView(DetailView):
 
 @login_required
 @require_POST
+@throttle("rating")
 def rate_restaurant(request, pk):
     restaurant = get_object_or_404(Restaurant, pk=pk)
 
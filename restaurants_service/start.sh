@@ -1,5 +1,9 @@
 #!/bin/sh
-python manage.py migrate --noinput
+# Stop here (and let the pod restart) if the migration step fails
+set -e
+python manage.py migrate_if_needed
+# Photo uploads whose background job died with the previous container
+python manage.py sweep_photo_uploads
 # Run only the accounts-related URLs by using a separate settings module OR just run full project
-gunicorn config.wsgi:application --bind 0.0.0.0:8001
-
+# exec: gunicorn becomes PID 1 and gets the pod's SIGTERM directly
+exec gunicorn -c config/gunicorn.conf.py --bind 0.0.0.0:8000
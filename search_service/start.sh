@@ -1,4 +1,8 @@
 #!/bin/sh
-python manage.py migrate --noinput
-gunicorn config.wsgi:application --bind 0.0.0.0:8004
-
+# Stop here (and let the pod restart) if the migration step fails
+set -e
+python manage.py migrate_if_needed
+# Photo uploads whose background job died with the previous container
+python manage.py sweep_photo_uploads
+# exec: gunicorn becomes PID 1 and gets the pod's SIGTERM directly
+exec gunicorn -c config/gunicorn.conf.py --bind 0.0.0.0:8000